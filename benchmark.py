@@ -0,0 +1,280 @@
+"""
+Benchmark the hot paths of the simulation and rendering code.
+
+Workloads mirror the scripts:
+ - snapshot: 1000 calls to advance with 10 steps each and an ExtremaTracker (snapshot.py)
+ - grid: 60 frames of the Flamm projection sweep over rs (anim-mercury.py)
+ - grid_fused: the same sweep through Transform.flamm2screen into a reused buffer
+ - orbit: 600 frames of the GR orbit with 40 steps each (anim-mercury.py)
+ - events: the orbit workload with a compiled periapsis event instead of the tracker
+ - tracker: ExtremaTracker.add_point on a precomputed trajectory
+ - tikz: building the TikZ source of a snapshot image
+ - tk: Tk.line for the grid sweep (only if a display is available)
+ - startup: import sim plus the first call of advance and of the compiled geometry
+   functions in fresh processes, compared against STARTUP_TARGET
+
+Results are written as JSON and can be compared against results from another commit:
+    python benchmark.py -o new.json --compare old.json
+"""
+
+import argparse
+from itertools import chain
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import sim
+
+
+WORLD_WIDTH = 16
+WORLD_HEIGHT = 16
+
+HLINES, VLINES = sim.make_grid((-WORLD_WIDTH/2-4, -WORLD_HEIGHT/2-4),
+                               (WORLD_WIDTH/2+4, WORLD_HEIGHT/2+4),
+                               nlines=(20, 20), resolution=(50, 50))
+
+
+def transform():
+    return sim.Transform((-WORLD_WIDTH/2, -WORLD_HEIGHT/2),
+                         (WORLD_WIDTH/2, WORLD_HEIGHT/2),
+                         (0, 0), (600, 600))
+
+def integrator_params(mercury, nsteps, beta, scale=1):
+    """Parameters of the scenes, scale=1 for the snapshot and scale=2 for the animation."""
+    return {"length": 2.0 * np.linalg.norm(mercury.v) / mercury.acc / 2 * scale,
+            "nsteps": nsteps,
+            "alpha": 0.0,
+            "beta": beta}
+
+def evolve(mercury, ncalls, params, tracker=None):
+    trajectory = [mercury.x]
+    for _ in range(ncalls):
+        mercury = sim.advance(mercury, **params, tracker=tracker)
+        trajectory.append(mercury.x)
+    return mercury, np.array(trajectory)
+
+
+def bench_snapshot():
+    mercury = sim.CBody.mercury()
+    params = integrator_params(mercury, 10, 2e6)
+    tracker = sim.ExtremaTracker(sim.CBody.sun(), on_periapsis=lambda point: None)
+    evolve(mercury, 1000, params, tracker)
+    return {"steps": 1000*10}
+
+def bench_grid():
+    nframes = 60
+    for rs in np.linspace(0, 0.017, nframes):
+        for line in chain(HLINES, VLINES):
+            sim.flamm_projection(line, np.array((0, 0)), rs,
+                                 np.array((WORLD_WIDTH, WORLD_HEIGHT)))
+    return {"frames": nframes}
+
+def bench_grid_fused():
+    nframes = 60
+    trafo = transform()
+    out = np.empty_like(HLINES[0], dtype=float)
+    for rs in np.linspace(0, 0.017, nframes):
+        for line in chain(HLINES, VLINES):
+            trafo.flamm2screen(line, np.array((0, 0)), rs,
+                               np.array((WORLD_WIDTH, WORLD_HEIGHT)), out=out)
+    return {"frames": nframes}
+
+def bench_orbit():
+    nframes = 600
+    mercury = sim.CBody.mercury()
+    params = integrator_params(mercury, 40, 2e6, scale=2)
+    tracker = sim.ExtremaTracker(sim.CBody.sun(), on_periapsis=lambda point: None)
+    evolve(mercury, nframes, params, tracker)
+    return {"frames": nframes, "steps": nframes*40}
+
+def bench_events():
+    nframes = 600
+    mercury = sim.CBody.mercury()
+    params = integrator_params(mercury, 40, 2e6, scale=2)
+    events = sim.Events([sim.events.periapsis(sim.CBody.sun().x, callback=lambda point: None)])
+    for _ in range(nframes):
+        mercury = events.advance(mercury, **params)
+    return {"frames": nframes, "steps": nframes*40}
+
+def bench_tracker(trajectory):
+    tracker = sim.ExtremaTracker(np.array((0, 0)), lambda point: None, lambda point: None)
+    for point in trajectory:
+        tracker.add_point(point)
+    return {"points": len(trajectory)}
+
+def bench_tikz(trajectory):
+    img = sim.tikz.Tikz(transform())
+    for line in chain(HLINES, VLINES):
+        line = sim.flamm_projection(line, np.array((0, 0)), 0.017,
+                                    np.array((WORLD_WIDTH, WORLD_HEIGHT)))
+        for start, end in sim.neighbours(line):
+            img.line([start, end], draw="white!50!aiphidarkachrom", lw=1)
+    T = len(trajectory)
+    for t, (start, end) in enumerate(sim.neighbours(trajectory)):
+        img.line([start, end], draw=f"white!{t/T*100}!darkachrom", lw=2)
+    source = str(img)
+    return {"segments": len(img._commands), "tikz_bytes": len(source.encode("utf-8"))}
+
+def bench_tk():
+    anim = sim.tk.Tk(transform())
+    nframes = 60
+    for rs in np.linspace(0, 0.017, nframes):
+        anim.clear("grid")
+        for line in chain(HLINES, VLINES):
+            anim.line(sim.flamm_projection(line, np.array((0, 0)), rs,
+                                           np.array((WORLD_WIDTH, WORLD_HEIGHT))),
+                      "#404040", tags="grid")
+        anim.update()
+    anim.window.destroy()
+    return {"frames": nframes}
+
+
+# Maximum acceptable time in seconds for importing sim and the first calls
+# in a fresh process (with a warm numba cache).
+STARTUP_TARGET = 1.0
+
+STARTUP_CODE = {
+    "physics": "import sim; sim.advance(sim.CBody.mercury(), 1.0, 10, 0.0, 0.0)",
+    "geometry": "import numpy as np; import sim; "
+                "sim.flamm_projection(np.ones((5, 2)), np.zeros(2), 0.01, np.ones(2)); "
+                "sim.pol2cart(np.array((1.0, 0.5)))",
+}
+
+def bench_startup():
+    result = {}
+    for name, code in STARTUP_CODE.items():
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True,
+                       cwd=Path(__file__).resolve().parent)
+        result[f"{name}_seconds"] = time.perf_counter() - start
+    # a pure physics run must not load any backend or numba
+    check = subprocess.run([sys.executable, "-c", STARTUP_CODE["physics"] +
+                            "; import sys; print(sum(mod in sys.modules for mod in "
+                            "('tkinter', 'numba', 'colour')))"],
+                           check=True, capture_output=True,
+                           cwd=Path(__file__).resolve().parent)
+    result["physics_heavy_imports"] = int(check.stdout)
+    result["within_target"] = int(max(result["physics_seconds"],
+                                      result["geometry_seconds"]) < STARTUP_TARGET)
+    return result
+
+
+def measure(func, *args, repeat=1):
+    """Run func repeat times and return the best wall time, peak memory, and func's counts."""
+    # warm up, e.g. to compile numba functions
+    func(*args)
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = func(*args)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    result = {"seconds": best, "peak_memory_bytes": peak, **counts}
+    # derive rates from counts
+    for name in ("steps", "frames", "points", "segments"):
+        if name in counts:
+            result[f"{name}_per_s"] = counts[name] / best
+    return result
+
+def have_display():
+    if not os.environ.get("DISPLAY") and platform.system() == "Linux":
+        return False
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+    except Exception:  # tkinter raises TclError or ImportError
+        return False
+    return True
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, check=True,
+                              cwd=Path(__file__).resolve().parent).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(names, repeat):
+    _, trajectory = evolve(sim.CBody.mercury(), 1000,
+                           integrator_params(sim.CBody.mercury(), 10, 2e6))
+
+    benchmarks = {"snapshot": (bench_snapshot,),
+                  "grid": (bench_grid,),
+                  "grid_fused": (bench_grid_fused,),
+                  "orbit": (bench_orbit,),
+                  "events": (bench_events,),
+                  "tracker": (bench_tracker, trajectory),
+                  "tikz": (bench_tikz, trajectory),
+                  "tk": (bench_tk,),
+                  "startup": (bench_startup,)}
+
+    results = {}
+    for name in names:
+        if name == "tk" and not have_display():
+            print("Skipping tk: no display available")
+            continue
+        func, *args = benchmarks[name]
+        results[name] = measure(func, *args, repeat=repeat)
+        print(f"{name:>10}: " + ", ".join(f"{key}={val:.4g}" for key, val
+                                          in results[name].items()))
+    return results
+
+def compare(results, reference):
+    """Print relative change of all timings with respect to reference results."""
+    print(f"\nComparison against {reference['commit']}:")
+    for name, result in results.items():
+        if name not in reference["benchmarks"]:
+            continue
+        ref = reference["benchmarks"][name]
+        ratio = result["seconds"] / ref["seconds"]
+        print(f"{name:>10}: {ratio:.3f}x time, "
+              f"{result['peak_memory_bytes'] / max(ref['peak_memory_bytes'], 1):.3f}x memory")
+
+
+BENCHMARKS = ("snapshot", "grid", "grid_fused", "orbit", "events", "tracker", "tikz", "tk", "startup")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("benchmarks", nargs="*", default=BENCHMARKS,
+                        help=f"Benchmarks to run, any of {', '.join(BENCHMARKS)}")
+    parser.add_argument("-o", "--output", default="bench_output.json",
+                        help="Write results as JSON to this file")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Number of timed repetitions, the best one is reported")
+    parser.add_argument("--compare", help="JSON file with results to compare against")
+    args = parser.parse_args()
+
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"Unknown benchmark: {name}")
+
+    results = {"commit": git_commit(),
+               "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "python": platform.python_version(),
+               "machine": platform.machine(),
+               "benchmarks": run(args.benchmarks, args.repeat)}
+
+    with open(args.output, "w") as outf:
+        json.dump(results, outf, indent=2)
+    print(f"Wrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as inf:
+            compare(results["benchmarks"], json.load(inf))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,54 @@
-from .geometry import *
+"""
+Simulate the perihelion precession of Mercury.
+
+Submodules with heavy dependencies (numba, colour, tkinter) are only imported
+when one of their names is accessed, so pure physics runs start quickly.
+"""
+
+import importlib
+
 from .physics import *
 from .util import *
 from .fileio import *
-from .graphics import *
 from .ping import *
 from .tracker import *
-from . import tikz
-from . import tk
+from .profiling import *
+from .streaming import *
+from .decimate import *
+from .timeline import *
+from .elements import *
+
+## Names exported by the package that are loaded lazily, mapped to their submodules.
+_LAZY_NAMES = {
+    **dict.fromkeys(("cart2pol", "pol2cart", "radial_transform", "flamm_depth",
+                     "flamm_paraboloid", "flamm_projection", "flamm_projection_screen",
+                     "make_grid"), "geometry"),
+    **dict.fromkeys(("Colour", "COLOURS", "COLOUR_ALIASES", "COLOUR_CACHE_SIZE",
+                     "norm_colour", "rgb_colour", "hex_colour", "Transform"), "graphics"),
+    **dict.fromkeys(("NBody", "advance_nbody", "PLANET_MASS_RATIOS", "PLANET_RADII"),
+                    "nbody"),
+    "Schwarzschild": "relativity",
+    "GifWriter": "gif",
+    **dict.fromkeys(("Event", "Events"), "events"),
+    "tune": "tuning",
+    **dict.fromkeys(("Svg", "SvgFrames"), "svg"),
+}
+
+## Submodules that are loaded lazily.
+_LAZY_MODULES = {"geometry", "graphics", "nbody", "relativity", "tikz", "tk", "null", "sweep",
+                 "cli", "scenes", "gif", "svg", "events",
+                 "tuning"}
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        value = getattr(importlib.import_module(f".{_LAZY_NAMES[name]}", __name__), name)
+    elif name in _LAZY_MODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # cache to avoid calling __getattr__ again
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted({*globals(), *_LAZY_NAMES, *_LAZY_MODULES})
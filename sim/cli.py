@@ -0,0 +1,94 @@
+"""
+Command line interface, run as `python -m sim <command> [options]`.
+
+Configuration is taken from (in order of increasing priority) the scene defaults,
+a JSON config file passed via --config, and command line arguments.
+The config file holds a single JSON object with the same keys as the scene's
+DEFAULTS, e.g. {"nsteps": 20, "beta": 1e6, "mp4": null}.
+Run with --dump-config to see all keys and their values.
+"""
+
+import argparse
+import json
+import sys
+
+from . import scenes
+
+## Configuration shared by all commands.
+COMMON_DEFAULTS = {
+    # number of threads for compiled code, None for the numba default
+    "threads": None,
+    # number of processes to use for parallelisable work
+    "processes": 1,
+}
+
+
+def load_config(fname):
+    """Load a configuration dict from a JSON file."""
+    with open(fname, "r") as inf:
+        config = json.load(inf)
+    if not isinstance(config, dict):
+        raise ValueError(f"Config file {fname} must contain a JSON object")
+    return config
+
+def make_config(defaults, file_config, args):
+    """Merge defaults, file config, and arguments, checking for unknown keys."""
+    unknown = set(file_config) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown configuration keys: {', '.join(sorted(unknown))}")
+    return {**defaults, **file_config, **args}
+
+def apply_common(config):
+    """Apply settings that affect the whole process."""
+    if config["threads"] is not None:
+        import numba
+        numba.set_num_threads(config["threads"])
+
+def make_parser(command=None):
+    """
+    Construct the argument parser.
+    Scene specific arguments are only added for command to avoid importing all scenes.
+    """
+
+    parser = argparse.ArgumentParser(prog="python -m sim",
+                                     description="Simulate the perihelion precession of Mercury.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, (_, description) in scenes.SCENES.items():
+        # suppress defaults to only get the arguments that were actually passed
+        subparser = subparsers.add_parser(name, help=description, description=description,
+                                          argument_default=argparse.SUPPRESS)
+        subparser.add_argument("-c", "--config", help="JSON config file")
+        subparser.add_argument("--dump-config", action="store_true",
+                               help="Print the full configuration and exit")
+        subparser.add_argument("-j", "--threads", type=int,
+                               help="Number of threads for compiled code")
+        subparser.add_argument("-p", "--processes", type=int,
+                               help="Number of processes for parallelisable work")
+        if name == command:
+            scenes.load(name).add_arguments(subparser)
+
+    return parser
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    # the first argument that names a scene is the command
+    command = next((arg for arg in argv if arg in scenes.SCENES), None)
+
+    args = vars(make_parser(command).parse_args(argv))
+    scene = scenes.load(args.pop("command"))
+    config_fname = args.pop("config", None)
+    dump = args.pop("dump_config", False)
+
+    config = make_config({**COMMON_DEFAULTS, **scene.DEFAULTS},
+                         load_config(config_fname) if config_fname else {},
+                         args)
+
+    if dump:
+        json.dump(config, sys.stdout, indent=2)
+        print()
+        return
+
+    apply_common(config)
+    scene.run(config)
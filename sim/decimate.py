@@ -0,0 +1,163 @@
+"""
+Reduce the number of points of a trajectory for display.
+
+Points are dropped if the polyline through the remaining points deviates from
+the original one by at most a tolerance. Measure the tolerance in screen units
+by passing a graphics.Transform, then the number of points depends on the
+image size but not on the number of simulated states.
+"""
+
+import math
+
+import numpy as np
+
+
+def _segment_distances(points, start, end):
+    """Return distances of points from the line segment start -> end."""
+    direction = end - start
+    length2 = direction @ direction
+    if length2 == 0:
+        return np.linalg.norm(points - start, axis=1)
+    # project onto the segment and clamp to its ends
+    t = np.clip((points - start) @ direction / length2, 0, 1)
+    return np.linalg.norm(points - (start + t[:, np.newaxis] * direction), axis=1)
+
+def simplify(points, tolerance, transform=None):
+    """
+    Ramer-Douglas-Peucker simplification of a polyline.
+
+    Arguments:
+        points: (N, 2) array of points.
+        tolerance: Maximum distance of dropped points from the simplified line.
+        transform: If given, tolerance is in screen units of this graphics.Transform.
+    Returns:
+        Sorted array of indices of the points to keep, always includes the first
+        and last point.
+    """
+
+    points = np.asarray(points, dtype=float)
+    if transform is not None:
+        points = transform.world2screen(points)
+    npoints = len(points)
+    if npoints < 3:
+        return np.arange(npoints)
+
+    keep = np.zeros(npoints, dtype=bool)
+    keep[0] = keep[-1] = True
+    # use an explicit stack instead of recursion to support long trajectories
+    stack = [(0, npoints-1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(points[first+1:last], points[first], points[last])
+        imax = np.argmax(distances)
+        if distances[imax] > tolerance:
+            split = first + 1 + imax
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return np.flatnonzero(keep)
+
+
+class Decimator:
+    """
+    Incrementally simplify a stream of points.
+
+    Uses the sector (cone intersection) algorithm: every point narrows the range
+    of directions from the last emitted point in which the simplified line may
+    continue. Once a new point lies outside this range, the previous point is
+    emitted. Each point is processed in constant time and at most one point is held back.
+    """
+
+    def __init__(self, tolerance, transform=None):
+        """
+        Arguments:
+            tolerance: Maximum distance of dropped points from the simplified line.
+            transform: If given, tolerance is in screen units of this graphics.Transform.
+        """
+
+        self.tolerance = tolerance
+        self.transform = transform
+
+        # index of the next point that is added
+        self._index = 0
+        # last emitted point in screen space, None if nothing has been emitted
+        self._anchor = None
+        # last added point (index, screen x, screen y, world point), None if it was emitted
+        self._pending = None
+        self._reset_sector()
+
+    def _reset_sector(self):
+        # reference direction and allowed range of angles relative to it
+        self._ref_angle = None
+        self._lower = -math.inf
+        self._upper = math.inf
+
+    def _accepts(self, x, y):
+        """Check whether screen point (x, y) lies in the sector and narrow the sector."""
+        dx = x - self._anchor[0]
+        dy = y - self._anchor[1]
+        dist = math.hypot(dx, dy)
+        if dist <= self.tolerance:
+            # too close to constrain the direction
+            return True
+
+        angle = math.atan2(dy, dx)
+        if self._ref_angle is None:
+            self._ref_angle = angle
+        # angle relative to reference in [-pi, pi)
+        angle = (angle - self._ref_angle + math.pi) % (2*math.pi) - math.pi
+        if not self._lower <= angle <= self._upper:
+            return False
+
+        half_width = math.asin(self.tolerance / dist)
+        self._lower = max(self._lower, angle - half_width)
+        self._upper = min(self._upper, angle + half_width)
+        return True
+
+    def add(self, points):
+        """
+        Add new points and return indices and world positions of points that are emitted.
+        Indices count all points ever passed to add.
+        """
+
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        screen = self.transform.world2screen(points) if self.transform is not None else points
+
+        indices = []
+        emitted = []
+        for world_point, (x, y) in zip(points, screen.tolist()):
+            index = self._index
+            self._index += 1
+
+            if self._anchor is None:
+                self._anchor = (x, y)
+                indices.append(index)
+                emitted.append(world_point)
+                continue
+
+            if self._pending is not None and not self._accepts(x, y):
+                # the last pending point becomes the new anchor
+                pindex, px, py, pworld = self._pending
+                indices.append(pindex)
+                emitted.append(pworld)
+                self._anchor = (px, py)
+                self._reset_sector()
+                self._accepts(x, y)
+
+            self._pending = (index, x, y, world_point)
+
+        return np.array(indices, dtype=int), np.array(emitted).reshape(-1, 2)
+
+    def flush(self):
+        """Emit the last point that was added, returns the same as add."""
+        if self._pending is None:
+            return np.empty(0, dtype=int), np.empty((0, 2))
+
+        index, x, y, world_point = self._pending
+        self._pending = None
+        self._anchor = (x, y)
+        self._reset_sector()
+        return np.array([index]), np.array([world_point])
@@ -0,0 +1,90 @@
+"""
+Osculating orbital elements of trajectories.
+
+The elements are those of the Kepler orbit around the origin with gravitational
+parameter CBody.acc that has the same position and velocity as a state, i.e.
+the GR terms of the force are treated as a perturbation. Lengths are in units
+of R0 like RS and RL2, angles in radians.
+
+All functions work on whole arrays, e.g. trajectories loaded with
+streaming.load_chunks, so the precession can be fitted from every state
+instead of only from the perihelia found by a tracker.
+"""
+
+import numpy as np
+
+## Columns of an elements array: semi-major axis, eccentricity, argument of periapsis,
+## true anomaly.
+ELEMENTS_SIZE = 4
+
+## Number of states processed at once by trajectory_elements, bounds temporary memory.
+ELEMENTS_CHUNK = 1 << 18
+
+
+def osculating_elements(x, v, acc):
+    """
+    Return semi-major axis, eccentricity, argument of periapsis, and true anomaly
+    for positions x and velocities v of shape (2,) or (N, 2).
+    The semi-major axis is negative for unbound states.
+    """
+
+    x, v = np.asarray(x, dtype=float), np.asarray(v, dtype=float)
+    r = np.hypot(x[..., 0], x[..., 1])
+    v2 = v[..., 0]**2 + v[..., 1]**2
+    radial = x[..., 0]*v[..., 0] + x[..., 1]*v[..., 1]
+
+    # eccentricity vector ((v**2 - acc/r) x - (x.v) v) / acc
+    fact = v2 - acc / r
+    ex = (fact * x[..., 0] - radial * v[..., 0]) / acc
+    ey = (fact * x[..., 1] - radial * v[..., 1]) / acc
+
+    omega = np.arctan2(ey, ex)
+    anomaly = np.mod(np.arctan2(x[..., 1], x[..., 0]) - omega, 2*np.pi)
+    return 1 / (2/r - v2/acc), np.hypot(ex, ey), omega, anomaly
+
+def trajectory_elements(states, acc, out=None):
+    """
+    Return an (N, ELEMENTS_SIZE) array of osculating elements of an (N, 4) array of
+    states (x, y, vx, vy), e.g. from streaming.load_chunks.
+    States are processed in chunks, so memory-mapped trajectories are not loaded at once.
+    """
+
+    if out is None:
+        out = np.empty((len(states), ELEMENTS_SIZE))
+    for start in range(0, len(states), ELEMENTS_CHUNK):
+        chunk = np.asarray(states[start:start+ELEMENTS_CHUNK])
+        rows = out[start:start+len(chunk)]
+        rows[:] = np.stack(osculating_elements(chunk[:, :2], chunk[:, 2:4], acc), axis=1)
+    return out
+
+def angular_rate(angles, dt):
+    """
+    Fit angles of equally spaced states linearly over time after unwrapping them.
+    Returns the slope in radians per unit time.
+    """
+
+    angles = np.unwrap(np.asarray(angles, dtype=float))
+    n = len(angles)
+    if n < 2:
+        return float("nan")
+    # least squares slope against 0, 1, ..., n-1, sum of (k - mean)**2 = n(n**2-1)/12
+    centred = np.arange(n) - (n-1) / 2
+    return float(centred @ angles / (n * (n*n - 1) / 12) / dt)
+
+def fit_precession(elements, dt):
+    """
+    Return the average perihelion advance per orbit in radians from an elements
+    array of equally spaced states, comparable to sweep.precession.
+
+    Orbits are counted from perihelion to perihelion through the rate of the true
+    anomaly, so the result does not depend on the Kepler period which is only
+    approximate for strongly perturbed orbits.
+    The states should span many orbits, the fit is biased by partial orbits.
+    """
+
+    elements = np.asarray(elements)
+    if len(elements) < 2:
+        return float("nan")
+    omega = angular_rate(elements[:, 2], dt)
+    anomaly = angular_rate(elements[:, 3], dt)
+    return 2*np.pi * omega / anomaly
@@ -0,0 +1,396 @@
+"""
+Detect events during the integration of an orbit.
+
+An event fires when its event function g(x, y, vx, vy) crosses zero. Event
+functions are evaluated inside the compiled integration loop after every step,
+crossings are located by root finding on the cubic Hermite interpolant of the
+step. Python is only re-entered when an event fires, e.g. to call callbacks.
+Events can terminate the integration after they fired a number of times.
+
+Built-in events are periapsis, apoapsis, closest_approach, crossing, and
+radius. Custom events take a numba compiled function g(x, y, vx, vy, t).
+
+Usage:
+    perihelion = periapsis(sun.x, terminal=10)
+    events = Events([perihelion, crossing(sun.x, (1, 0))])
+    mercury = events.advance(mercury, length, nsteps, alpha, beta)
+    events.occurrences(perihelion)  # rows of t, x, y, vx, vy
+"""
+
+import math
+import warnings
+
+import numba
+from numba.core.errors import NumbaExperimentalFeatureWarning
+from numba import literal_unroll
+import numpy as np
+
+from .physics import RS, RL2
+
+## Kinds of built-in event functions.
+APSIS = 0
+CROSSING = 1
+RADIUS = 2
+CUSTOM = 3
+
+## Number of parameters of built-in event functions: point (2), axis (2), value.
+NPARAMS = 5
+
+## Number of columns of an occurrence: t, x, y, vx, vy.
+OCCURRENCE_SIZE = 5
+
+
+@numba.jit(nopython=True, cache=True)
+def _never(x, y, vx, vy, t):
+    """Placeholder for custom event functions, never crosses zero."""
+    return 1.0
+
+@numba.jit(nopython=True, cache=True)
+def _event_value(kind, param, x, y, vx, vy):
+    """Evaluate a built-in event function."""
+    dx = x - param[0]
+    dy = y - param[1]
+    if kind == APSIS:
+        # radial velocity relative to the point
+        return dx*vx + dy*vy
+    if kind == CROSSING:
+        # signed distance from the line through the point along axis
+        return param[2]*dy - param[3]*dx
+    # RADIUS
+    return math.sqrt(dx*dx + dy*dy) - param[4]
+
+@numba.jit(nopython=True, cache=True)
+def _accepted(kind, param, x, y):
+    """Return False if a root of a built-in event does not count as an event."""
+    if kind == CROSSING and param[4] != 0:
+        # only crossings of the half-line in direction of axis
+        return (x - param[0])*param[2] + (y - param[1])*param[3] > 0
+    return True
+
+@numba.jit(nopython=True, cache=True)
+def _interpolate(s0, s1, dt, u):
+    """Return the state at fraction u of a step from s0 to s1 using cubic Hermite interpolation."""
+    u2 = u*u
+    u3 = u2*u
+    h00 = 2*u3 - 3*u2 + 1
+    h10 = u3 - 2*u2 + u
+    h01 = -2*u3 + 3*u2
+    h11 = u3 - u2
+    return (h00*s0[0] + h10*dt*s0[2] + h01*s1[0] + h11*dt*s1[2],
+            h00*s0[1] + h10*dt*s0[3] + h01*s1[1] + h11*dt*s1[3],
+            (1-u)*s0[2] + u*s1[2],
+            (1-u)*s0[3] + u*s1[3])
+
+@numba.jit(nopython=True, cache=True)
+def _crossed(g0, g1, direction):
+    """Did g cross zero from g0 to g1 in the given direction (+1 rising, -1 falling, 0 any)?"""
+    if direction >= 0 and g0 < 0 <= g1:
+        return True
+    return direction <= 0 and g0 > 0 >= g1
+
+@numba.jit(nopython=True, cache=True)
+def _locate_builtin(kind, param, s0, s1, dt, g0, g1):
+    """Return the fraction of the step where a built-in event function is zero (Illinois method)."""
+    a, b = 0.0, 1.0
+    ga, gb = g0, g1
+    side = 0
+    u = 0.0
+    for _ in range(60):
+        u = (a*gb - b*ga) / (gb - ga)
+        x, y, vx, vy = _interpolate(s0, s1, dt, u)
+        g = _event_value(kind, param, x, y, vx, vy)
+        if g == 0 or b - a < 1e-14:
+            break
+        if (g < 0) == (ga < 0):
+            a, ga = u, g
+            if side == -1:
+                gb /= 2
+            side = -1
+        else:
+            b, gb = u, g
+            if side == 1:
+                ga /= 2
+            side = 1
+    return u
+
+@numba.jit(nopython=True, cache=True)
+def _locate_custom(func, s0, s1, t0, dt, g0, g1):
+    """Like _locate_builtin for a custom event function."""
+    a, b = 0.0, 1.0
+    ga, gb = g0, g1
+    side = 0
+    u = 0.0
+    for _ in range(60):
+        u = (a*gb - b*ga) / (gb - ga)
+        x, y, vx, vy = _interpolate(s0, s1, dt, u)
+        g = func(x, y, vx, vy, t0 + u*dt)
+        if g == 0 or b - a < 1e-14:
+            break
+        if (g < 0) == (ga < 0):
+            a, ga = u, g
+            if side == -1:
+                gb /= 2
+            side = -1
+        else:
+            b, gb = u, g
+            if side == 1:
+                ga /= 2
+            side = 1
+    return u
+
+@numba.jit(nopython=True, cache=True)
+def _record(out, nfired, index, s0, s1, t0, dt, u):
+    x, y, vx, vy = _interpolate(s0, s1, dt, u)
+    out[nfired, 0] = index
+    out[nfired, 1] = t0 + u*dt
+    out[nfired, 2] = x
+    out[nfired, 3] = y
+    out[nfired, 4] = vx
+    out[nfired, 5] = vy
+    return nfired + 1
+
+@numba.jit(nopython=True, cache=True)
+def _integrate_events(state, t, dt, nsteps, acc, alpha, beta,
+                      kinds, params, directions, custom, gprev, out):
+    """
+    Integrate like physics._integrate and evaluate all events after every step.
+
+    Stops after the first step in which events fired and stores them in out as
+    rows of (event index, t, x, y, vx, vy). Custom events have the indices
+    following the built-in ones.
+    state and gprev (the event values at state) are updated in place.
+    Returns the number of steps taken and the number of events that fired.
+    """
+
+    nbuiltin = len(kinds)
+    s0 = np.empty(4)
+    s1 = np.empty(4)
+    x, y, vx, vy = state[0], state[1], state[2], state[3]
+
+    for step in range(nsteps):
+        s0[0], s0[1], s0[2], s0[3] = x, y, vx, vy
+
+        r = math.sqrt(x*x + y*y)
+        # compute the factor coming from General Relativity
+        grfact = 1 + alpha * RS / r + beta * RL2 / r**2
+        fact = -acc * grfact / r**2
+        vx += fact * x / r * dt
+        vy += fact * y / r * dt
+        x += vx*dt
+        y += vy*dt
+
+        s1[0], s1[1], s1[2], s1[3] = x, y, vx, vy
+        t0 = t + step*dt
+        nfired = 0
+
+        for i in range(nbuiltin):
+            g = _event_value(kinds[i], params[i], x, y, vx, vy)
+            if _crossed(gprev[i], g, directions[i]):
+                u = _locate_builtin(kinds[i], params[i], s0, s1, dt, gprev[i], g)
+                xe, ye, _, _ = _interpolate(s0, s1, dt, u)
+                if _accepted(kinds[i], params[i], xe, ye):
+                    nfired = _record(out, nfired, i, s0, s1, t0, dt, u)
+            gprev[i] = g
+
+        i = nbuiltin
+        for func in literal_unroll(custom):
+            g = func(x, y, vx, vy, t0 + dt)
+            if i < len(gprev):
+                if _crossed(gprev[i], g, directions[i]):
+                    u = _locate_custom(func, s0, s1, t0, dt, gprev[i], g)
+                    nfired = _record(out, nfired, i, s0, s1, t0, dt, u)
+                gprev[i] = g
+            i += 1
+
+        if nfired > 0:
+            state[0], state[1], state[2], state[3] = x, y, vx, vy
+            return step + 1, nfired
+
+    state[0], state[1], state[2], state[3] = x, y, vx, vy
+    return nsteps, 0
+
+@numba.jit(nopython=True, cache=True)
+def _initial_values(state, t, kinds, params, custom, gprev):
+    """Evaluate all event functions at state."""
+    x, y, vx, vy = state[0], state[1], state[2], state[3]
+    for i in range(len(kinds)):
+        gprev[i] = _event_value(kinds[i], params[i], x, y, vx, vy)
+    i = len(kinds)
+    for func in literal_unroll(custom):
+        if i < len(gprev):
+            gprev[i] = func(x, y, vx, vy, t)
+        i += 1
+
+
+class Event:
+    """
+    An event that fires when an event function crosses zero.
+    Use the functions periapsis, apoapsis, closest_approach, crossing, radius,
+    and custom to construct events.
+    """
+
+    def __init__(self, kind, params=None, func=None, direction=0, terminal=0, callback=None):
+        """
+        Arguments:
+            kind: One of APSIS, CROSSING, RADIUS, CUSTOM.
+            params: NPARAMS parameters of built-in event functions.
+            func: Compiled event function of custom events.
+            direction: +1 to only fire when g increases, -1 when it decreases, 0 for both.
+            terminal: Stop the integration when the event has fired this many times,
+                      0 to never stop.
+            callback: Function to call with the position of each occurrence.
+        """
+
+        self.kind = kind
+        self.params = np.zeros(NPARAMS) if params is None else np.asarray(params, dtype=float)
+        self.func = func
+        self.direction = direction
+        self.terminal = terminal
+        self.callback = callback
+        # number of times the event has fired
+        self.count = 0
+
+def periapsis(centre=(0, 0), terminal=0, callback=None):
+    """Closest point of an orbit around centre."""
+    return Event(APSIS, (*centre, 0, 0, 0), direction=1, terminal=terminal, callback=callback)
+
+def apoapsis(centre=(0, 0), terminal=0, callback=None):
+    """Farthest point of an orbit around centre."""
+    return Event(APSIS, (*centre, 0, 0, 0), direction=-1, terminal=terminal, callback=callback)
+
+def closest_approach(point, terminal=0, callback=None):
+    """Closest approach to a fixed point."""
+    return periapsis(point, terminal, callback)
+
+def crossing(point, axis, half_line=True, direction=1, terminal=0, callback=None):
+    """
+    Crossing of the line through point along axis, e.g. the x-axis through the Sun.
+    If half_line is True, only crossings in direction of axis from point count.
+    With direction=1, only counter-clockwise crossings count, i.e. the event
+    counts completed orbits if the half-line starts at the central body.
+    """
+    return Event(CROSSING, (*point, *axis, float(half_line)), direction=direction,
+                 terminal=terminal, callback=callback)
+
+def radius(value, centre=(0, 0), direction=0, terminal=0, callback=None):
+    """Distance from centre reaches value."""
+    return Event(RADIUS, (*centre, 0, 0, value), direction=direction, terminal=terminal,
+                 callback=callback)
+
+def custom(func, direction=0, terminal=0, callback=None):
+    """Event function func(x, y, vx, vy, t) which must be compiled with numba."""
+    return Event(CUSTOM, func=func, direction=direction, terminal=terminal, callback=callback)
+
+
+class Events:
+    """
+    A set of events tracked along one trajectory.
+    Use Events.advance instead of physics.advance.
+    """
+
+    def __init__(self, events, time=0.0):
+        """
+        Arguments:
+            events: Iterable of Event objects.
+            time: Time of the initial state.
+        """
+
+        builtin = [event for event in events if event.kind != CUSTOM]
+        custom_events = [event for event in events if event.kind == CUSTOM]
+        # built-in events first, as indexed by the compiled code
+        self.events = builtin + custom_events
+        self.time = time
+        # set when a terminal event has fired
+        self.terminated = False
+
+        self._kinds = np.array([event.kind for event in builtin], dtype=np.int64)
+        self._params = np.array([event.params for event in builtin], dtype=float) \
+            .reshape(len(builtin), NPARAMS)
+        self._directions = np.array([event.direction for event in self.events], dtype=np.int64)
+        self._custom = tuple(event.func for event in custom_events) or (_never,)
+        # event values at the current state, NaN until the first step
+        self._gprev = np.full(len(self.events), np.nan)
+        self._out = np.empty((len(self.events), 1 + OCCURRENCE_SIZE))
+        # resolve the compiled kernel once, typing a tuple of functions on every call is slow
+        with warnings.catch_warnings():
+            # passing custom event functions to the kernel is an experimental numba feature
+            warnings.simplefilter("ignore", NumbaExperimentalFeatureWarning)
+            self._kernel = _integrate_events.compile(
+                (numba.float64[::1], numba.float64, numba.float64, numba.int64, numba.float64,
+                 numba.float64, numba.float64, numba.typeof(self._kinds),
+                 numba.typeof(self._params), numba.typeof(self._directions),
+                 numba.typeof(self._custom), numba.typeof(self._gprev),
+                 numba.typeof(self._out)))
+        # per event: list of occurrences
+        self._occurrences = [[] for _ in self.events]
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def occurrences(self, event):
+        """Return an (N, 5) array of (t, x, y, vx, vy) of all occurrences of an event."""
+        rows = self._occurrences[self.events.index(event)]
+        return np.array(rows).reshape(len(rows), OCCURRENCE_SIZE)
+
+    def integrate(self, body, dt, nsteps, alpha, beta):
+        """
+        Advance body in place by nsteps steps of size dt, like physics._integrate.
+        Stops early if a terminal event fires, then body is at the event.
+        Returns the number of steps taken.
+        """
+
+        if self.terminated:
+            return 0
+
+        state = np.concatenate((body.x, body.v)).astype(float)
+        if np.isnan(self._gprev).any():
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", NumbaExperimentalFeatureWarning)
+                _initial_values(state, self.time, self._kinds, self._params, self._custom,
+                                self._gprev)
+
+        done = 0
+        while done < nsteps:
+            steps, nfired = self._kernel(state, float(self.time), float(dt), int(nsteps - done),
+                                         float(body.acc), float(alpha), float(beta),
+                                         self._kinds, self._params, self._directions,
+                                         self._custom, self._gprev, self._out)
+            done += steps
+            self.time += steps*dt
+            # process events of the step in the order they happened
+            for row in sorted(self._out[:nfired].tolist(), key=lambda row: row[1]):
+                if self._fire(int(row[0]), row[1:]):
+                    state[:] = row[2:]
+                    self.time = row[1]
+                    self.terminated = True
+                    break
+            if self.terminated:
+                break
+
+        body.x[0], body.x[1], body.v[0], body.v[1] = state
+        return done
+
+    def _fire(self, index, occurrence):
+        """Record an occurrence, returns True if the integration must stop."""
+        event = self.events[index]
+        event.count += 1
+        self._occurrences[index].append(occurrence)
+        if event.callback is not None:
+            event.callback(np.array(occurrence[1:3]))
+        return event.terminal > 0 and event.count >= event.terminal
+
+    def advance(self, body, length, nsteps, alpha, beta, out=None):
+        """
+        Same as physics.advance but tracks the events instead of a tracker.
+        If a terminal event fires, the returned body is at the event.
+        """
+
+        if out is None:
+            out = body.copy()
+        elif out is not body:
+            out.x[:] = body.x
+            out.v[:] = body.v
+            out.acc = body.acc
+
+        self.integrate(out, length / nsteps, nsteps, alpha, beta)
+        return out
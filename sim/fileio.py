@@ -1,6 +1,20 @@
 import subprocess
 from pathlib import Path
 import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import numbers
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
 
 def init_directory(path, overwrite):
     """Create directory, remove it if it exists and overwrite==True."""
@@ -10,77 +24,599 @@ def init_directory(path, overwrite):
         shutil.rmtree(path)
     path.mkdir()
 
+def link_file(source, target):
+    """Hard link target to source, copy if linking is not possible."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def postscript_digest(data):
+    """Return a hash of postscript data that ignores the creation date."""
+    digest = hashlib.blake2b(digest_size=16)
+    for line in data.splitlines(keepends=True):
+        if not line.startswith("%%CreationDate"):
+            digest.update(line.encode("latin-1", errors="replace"))
+    return digest.digest()
+
+def read_ppm(data):
+    """Return the image of binary PPM (P6) data as (height, width, 3) uint8 array."""
+    # header: magic, width, height, maxval separated by whitespace, optional comments
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while data[pos:pos+1].isspace():
+            pos += 1
+        if data[pos:pos+1] == b"#":
+            pos = data.index(b"\n", pos)
+            continue
+        end = pos
+        while not data[end:end+1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    if fields[0] != b"P6" or int(fields[3]) != 255:
+        raise ValueError("Only 8 bit binary PPM images are supported")
+    width, height = int(fields[1]), int(fields[2])
+    # exactly one whitespace character separates header and pixels
+    return np.frombuffer(data, dtype=np.uint8, count=width*height*3,
+                         offset=pos+1).reshape(height, width, 3)
+
+def rasterize(fname, size):
+    """Rasterize an EPS or PDF file with Ghostscript and return the image as an array."""
+    fit = "-dPDFFitPage" if Path(fname).suffix.lower() == ".pdf" else "-dEPSFitPage"
+    result = subprocess.run(["gs", "-q", "-dSAFER", "-dBATCH", "-dNOPAUSE", "-sDEVICE=ppmraw",
+                             f"-g{size[0]}x{size[1]}", fit,
+                             "-sOutputFile=-", f"{fname}"],
+                            check=True, capture_output=True)
+    return read_ppm(result.stdout)
+
+def _resample_axis(image, n, axis):
+    """Average image over n equal intervals along axis, intervals may cover fractional pixels."""
+
+    m = image.shape[axis]
+    if m % n == 0:
+        # integer factor, average blocks of pixels
+        factor = m // n
+        index = [slice(None)] * image.ndim
+        index[axis] = slice(0, None, factor)
+        total = image[tuple(index)].astype(np.float32)
+        # adding strided views is much faster than summing over a short axis
+        for offset in range(1, factor):
+            index[axis] = slice(offset, None, factor)
+            total += image[tuple(index)]
+        return total * np.float32(1 / factor)
+    edges = np.linspace(0, m, n+1)
+    lower = np.floor(edges).astype(int)
+    shape = [1]*image.ndim
+    shape[axis] = n+1
+    frac = (edges - lower).astype(np.float32).reshape(shape)
+
+    if n < m:
+        # sum of whole pixels from the pixel of one edge to the pixel of the next one
+        # corrected by the fractions of the pixels the edges cut
+        if axis == 0:
+            # summing blocks of contiguous rows is much faster than reduceat along axis 0
+            sums = np.empty((n, *image.shape[1:]), dtype=np.float32)
+            for j in range(n):
+                np.sum(image[lower[j]:lower[j+1]], axis=0, dtype=np.float32, out=sums[j])
+        else:
+            sums = np.add.reduceat(image, lower[:-1], axis=axis, dtype=np.float32)
+    else:
+        # several edges per pixel, differences of cumulative sums
+        csum = np.cumsum(image, axis=axis, dtype=np.float32)
+        csum = np.concatenate((np.zeros_like(np.take(csum, [0], axis=axis)), csum), axis=axis)
+        sums = np.diff(np.take(csum, lower, axis=axis), axis=axis)
+    # frac is 0 at the last edge, any pixel can be used there
+    cut = frac * np.take(image, np.minimum(lower, m-1), axis=axis)
+    return (sums + np.diff(cut, axis=axis)) * np.float32(n / m)
+
+def resample(image, size):
+    """
+    Resize a (height, width, 3) uint8 image to size (width, height).
+    Every output pixel is the average over the area it covers, which anti-aliases
+    when downsampling.
+    """
+    width, height = size
+    result = _resample_axis(_resample_axis(image, height, 0), width, 1)
+    return np.clip(np.rint(result), 0, 255).astype(np.uint8)
+
+def _png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+def write_png(fname, image, level=6):
+    """Write a (height, width, 3) uint8 image as PNG without external tools."""
+    height, width = image.shape[:2]
+    # every row starts with filter type 0 (none)
+    rows = np.zeros((height, 1 + 3*width), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, 3*width)
+    with open(fname, "wb") as outf:
+        outf.write(b"\x89PNG\r\n\x1a\n")
+        outf.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        outf.write(_png_chunk(b"IDAT", zlib.compress(rows.tobytes(), level)))
+        outf.write(_png_chunk(b"IEND", b""))
+
+def png_targets(fname, sizes):
+    """Return a dict mapping names fname-WIDTHxHEIGHT.png next to fname to sizes."""
+    fname = Path(fname)
+    return {fname.with_name(f"{fname.stem}-{width}x{height}.png"): (width, height)
+            for width, height in sizes}
+
+def convert_sizes(fname, targets, processes=1):
+    """
+    Rasterize an EPS or PDF file once and write PNGs of several sizes.
+
+    The file is rasterized with Ghostscript at the largest width and height of
+    all sizes, smaller sizes are downsampled from that image. Downsampling and
+    PNG encoding run in up to processes threads. All sizes should have the
+    aspect ratio of the image, other sizes are stretched.
+
+    Arguments:
+        fname: EPS or PDF file.
+        targets: dict mapping PNG file names to sizes (width, height).
+        processes: Number of threads.
+    Returns:
+        List of the images in the order of targets.
+    """
+
+    sizes = [tuple(size) for size in targets.values()]
+    largest = (max(size[0] for size in sizes), max(size[1] for size in sizes))
+    image = rasterize(fname, largest)
+
+    def _write(target):
+        out_fname, size = target
+        out = image if tuple(size) == largest else resample(image, size)
+        write_png(out_fname, out)
+        return out
+
+    with ThreadPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_write, targets.items()))
+
+
+class _GifStream:
+    """Rasterize frames and add them to a GifWriter in a background thread."""
+
+    def __init__(self, writer, size, maxsize=8):
+        self.writer = writer
+        self.size = tuple(size)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_key = None
+        image = None
+        for fname, key, frame in iter(self._queue.get, None):
+            if self._error is not None:
+                # keep consuming so that put never blocks
+                continue
+            try:
+                # duplicates of the previous frame are not rasterized again
+                if key != last_key:
+                    image = frame if frame is not None else rasterize(fname, self.size)
+                    last_key = key
+                self.writer.add_frame(image)
+            except Exception as exc:  # re-raised in close
+                self._error = exc
+
+    def put(self, fname, key, image=None):
+        """
+        Queue frame fname, frames with the same key have the same image.
+        image is an already rasterized frame of the GIF's size, if any.
+        """
+        self._queue.put((fname, key, image))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self.writer.close()
+        if self._error is not None:
+            raise self._error
+
 
 class FrameManager:
     """
     Write and convert animation frames.
+
+    Frames that are identical to a previously saved frame are not written
+    or converted again, their files are hard links to the earlier ones instead.
     """
 
-    def __init__(self, path, overwrite):
+    def __init__(self, path, overwrite, deduplicate=True, extra_sizes=()):
+        """
+        Arguments:
+            path: Directory to write frames into.
+            overwrite: Remove path if it exists, otherwise raise an error.
+            deduplicate: Link frames identical to earlier ones instead of writing them.
+            extra_sizes: Sizes (width, height) of additional PNGs of every frame,
+                         written to subdirectories WIDTHxHEIGHT of path. They are
+                         produced from the same rasterization as the main PNG.
+        """
+
         self.path = Path(path)
+        self.deduplicate = deduplicate
+        self.extra_sizes = [tuple(size) for size in extra_sizes]
         self._fname_fmt = "{:04d}.eps"
         self._current = 0
 
-        init_directory(path, overwrite)
+        # digest -> number of first frame with this content
+        self._digests = {}
+        # number of duplicate frame -> number of original frame
+        self._duplicates = {}
+        # GIF that is written while frames are saved
+        self._gif = None
+
+        init_directory(self.path, overwrite)
+        for size in self.extra_sizes:
+            self.size_path(size).mkdir()
+
+    def size_path(self, size):
+        """Return the directory of PNGs with one of the extra sizes."""
+        return self.path/f"{size[0]}x{size[1]}"
+
+    def _pngs(self, number):
+        """Return the names of all PNGs of a frame, the main one first."""
+        name = Path(self._fname_fmt.format(number)).with_suffix(".png")
+        return [self.path/name] + [self.size_path(size)/name for size in self.extra_sizes]
+
+    def nduplicates(self):
+        """Return the number of frames that were saved as duplicates."""
+        return len(self._duplicates)
 
     def save_frame(self, canvas, ps=True, png=False, size=None):
         """Save a single frame as postscript or PNG or both."""
 
+        if png and size is None:
+            raise ValueError("Need a size when saving PNGs")
+        if self._gif and not ps:
+            raise ValueError("Streaming a GIF requires frames to be saved as postscript")
+
         psname = self.path/self._fname_fmt.format(self._current)
-        # save ps image in any case
         # crop image to remove borders
-        canvas.postscript(file=psname, colormode="color",
-                          x=1, width=canvas.winfo_reqwidth()-2,
-                          y=1, height=canvas.winfo_reqheight()-2)
+        data = canvas.postscript(colormode="color",
+                                 x=1, width=canvas.winfo_reqwidth()-2,
+                                 y=1, height=canvas.winfo_reqheight()-2)
 
-        if png:
-            # convert to png
-            if size is None:
-                raise ValueError("Need a size when saving PNGs")
-            self.convert_frame(self._current, size)
+        original = None
+        images = None
+        if self.deduplicate:
+            digest = postscript_digest(data)
+            original = self._digests.get(digest)
+            if original is None:
+                self._digests[digest] = self._current
 
-        if not ps:
-            # remove ps written before
-            psname.unlink()
+        if original is not None:
+            self._duplicates[self._current] = original
+            images = self._save_duplicate(original, data, ps, png, size)
+        else:
+            # save ps image in any case
+            with open(psname, "w") as psf:
+                psf.write(data)
+
+            if png:
+                # convert to png
+                images = self.convert_frame(self._current, size)
+
+            if not ps:
+                # remove ps written before
+                psname.unlink()
+
+        if self._gif:
+            # reuse the rasterization of the PNGs if there is one of the GIF's size
+            self._gif.put(psname, self._current if original is None else original,
+                          (images or {}).get(self._gif.size))
 
         self._current += 1
 
+    def _save_duplicate(self, original, data, ps, png, size):
+        """
+        Save the current frame by linking to the files of frame original where possible.
+        Returns the result of convert_frame if the frame had to be converted.
+        """
+
+        source = self.path/self._fname_fmt.format(original)
+        target = self.path/self._fname_fmt.format(self._current)
+
+        if ps or (png and not source.with_suffix(".png").exists()):
+            if source.exists():
+                link_file(source, target)
+            else:
+                with open(target, "w") as psf:
+                    psf.write(data)
+
+        images = None
+        if png:
+            if source.with_suffix(".png").exists():
+                for source_png, target_png in zip(self._pngs(original), self._pngs(self._current)):
+                    link_file(source_png, target_png)
+            else:
+                images = self.convert_frame(self._current, size)
+            if not ps and target.exists():
+                target.unlink()
+        return images
+
     def convert_frame(self, number, size):
-        """Convert ps of a frame to PNG."""
+        """
+        Convert ps of a frame to PNG of given size and of all extra sizes.
+        The frame is rasterized once for all sizes.
+        Returns a dict mapping sizes to images, e.g. to reuse them for a GIF.
+        """
 
         if number is None:
             number = self._current
         fname = self.path/self._fname_fmt.format(number)
+        sizes = [tuple(size), *self.extra_sizes]
+        images = convert_sizes(fname, dict(zip(self._pngs(number), sizes)))
+        return dict(zip(sizes, images))
 
-        subprocess.run(["gs", "-dSAFER", "-dBATCH", "-dNOPAUSE", "-sDEVICE=png16m",
-                        f"-g{size[0]}x{size[1]}", "-dEPSFitPage",
-                        f"-sOutputFile={fname.with_suffix('.png')}", f"{fname}"],
-                       check=True, capture_output=True)
+    def convert_all(self, size, processes=1):
+        """Convert ps of all saved frames to PNG, running up to processes conversions at once."""
 
-    def convert_to_gif(self, fname):
+        with ThreadPoolExecutor(max_workers=processes) as executor:
+            # consume the iterator to raise exceptions
+            list(executor.map(lambda number: self.convert_frame(number, size),
+                              (number for number in range(self._current)
+                               if number not in self._duplicates)))
+
+        for number, original in self._duplicates.items():
+            for source_png, target_png in zip(self._pngs(original), self._pngs(number)):
+                link_file(source_png, target_png)
+
+    def stream_gif(self, fname, size, fps=60, palette=None):
+        """
+        Write a GIF of all frames saved from now on.
+        Frames are rasterized and encoded in a background thread while the
+        animation is running, call finish_gif after the last frame.
+        Requires frames to be saved as postscript.
+        """
+        from .gif import GifWriter
+        self._gif = _GifStream(GifWriter(fname, fps=fps, palette=palette), size)
+
+    def finish_gif(self):
+        """Wait for all frames to be encoded and close the GIF started by stream_gif."""
+        gif, self._gif = self._gif, None
+        gif.close()
+
+    def convert_to_gif(self, fname, size, fps=60, processes=1, palette=None):
         """
         Make a GIF out of all saved frames.
-        Requires frames to be saved as PNG.
+        Frames are rasterized by up to processes Ghostscript processes and encoded
+        one at a time, so memory use does not depend on the number of frames.
+        Requires frames to be saved as postscript.
         """
-        subprocess.run(["convert", *sorted(filter(lambda x: x.suffix == ".png",
-                                                  self.path.iterdir()),
-                                           key=lambda x: int(x.stem)),
-                        fname],
-                       check=True, capture_output=True)
 
-    def convert_to_mp4(self, fname, fps=60):
+        from .gif import GifWriter
+
+        # only rasterize frames that differ from their predecessor
+        keys = [self._duplicates.get(number, number) for number in range(self._current)]
+        changes = [number for number, key in enumerate(keys)
+                   if number == 0 or key != keys[number-1]]
+
+        with ThreadPoolExecutor(max_workers=processes) as executor, \
+             GifWriter(fname, fps=fps, palette=palette) as writer:
+
+            def _images():
+                # keep a bounded number of rasterizations in flight
+                futures = deque()
+                for number in changes:
+                    futures.append(executor.submit(
+                        rasterize, self.path/self._fname_fmt.format(number), size))
+                    if len(futures) > 2*processes:
+                        yield futures.popleft().result()
+                while futures:
+                    yield futures.popleft().result()
+
+            images = _images()
+            rasterized = set(changes)
+            image = None
+            for number in range(self._current):
+                if number in rasterized:
+                    image = next(images)
+                writer.add_frame(image)
+
+    def convert_to_mp4(self, fname, fps=60, size=None):
         """
         Make an MP4 out of all saved frames.
-        Requires frames to be saved as PNG.
+        Requires frames to be saved as PNG, size selects one of the extra sizes.
         """
+        path = self.path if size is None else self.size_path(size)
         subprocess.run(["ffmpeg",
                         "-y",
                         "-xerror",
                         "-framerate", f"{fps}",
-                        "-i", f"{self.path}/%04d.png",
+                        "-i", f"{path}/%04d.png",
                         "-c:v", "libx264",
                         "-profile:v", "high",
                         "-crf", "20", "-pix_fmt",
                         "yuv420p",
                         fname],
                        check=True, capture_output=True)
+
+
+def code_version(package=Path(__file__).resolve().parent):
+    """
+    Return a digest of all Python sources in package including subpackages,
+    e.g. the scenes that drive the simulations.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for fname in sorted(package.rglob("*.py")):
+        digest.update(fname.relative_to(package).as_posix().encode())
+        digest.update(fname.read_bytes())
+    return digest.hexdigest()
+
+def _numeric_items(values):
+    """Return the (name, value) pairs of a dict that can be queried by range."""
+    return [(name, float(value)) for name, value in values.items()
+            if isinstance(value, numbers.Real) and not isinstance(value, bool)]
+
+
+class ResultStore:
+    """
+    Local store of simulation results.
+
+    An SQLite index in path/index.sqlite holds the parameters, the code version,
+    and scalar metrics of every run. Arrays, e.g. trajectories or perihelia, are
+    stored as .npy files in path/blobs and can be loaded memory-mapped.
+    Runs are identified by their parameters and the code version, so a run is
+    only computed once per version of the code.
+
+    Usage:
+        store = ResultStore("results")
+        record = store.compute(params, simulate)  # skipped if already stored
+        for record in store.find(beta=(1e6, 2e6), nsteps=(10, None)):
+            trajectory = store.load(record, "trajectory")
+    """
+
+    def __init__(self, path, version=None):
+        """
+        Arguments:
+            path: Directory of the store, is created if it does not exist.
+            version: Code version of new results, defaults to code_version().
+        """
+
+        self.path = Path(path)
+        self.version = code_version() if version is None else version
+        (self.path/"blobs").mkdir(parents=True, exist_ok=True)
+
+        self._db = sqlite3.connect(self.path/"index.sqlite")
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    key TEXT PRIMARY KEY, version TEXT, created REAL,
+                    params TEXT, metrics TEXT, arrays TEXT);
+                -- numeric parameters and metrics for range queries
+                CREATE TABLE IF NOT EXISTS params (
+                    key TEXT, name TEXT, value REAL, PRIMARY KEY (key, name));
+                CREATE TABLE IF NOT EXISTS metrics (
+                    key TEXT, name TEXT, value REAL, PRIMARY KEY (key, name));
+                CREATE INDEX IF NOT EXISTS params_by_value ON params (name, value);
+                CREATE INDEX IF NOT EXISTS metrics_by_value ON metrics (name, value);
+            """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self._db.close()
+
+    def key(self, params, version=None):
+        """Return the key of a run with given parameters (a JSON serialisable dict)."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update((self.version if version is None else version).encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _record(row):
+        key, version, created, params, metrics, arrays = row
+        return {"key": key, "version": version, "created": created,
+                "params": json.loads(params), "metrics": json.loads(metrics),
+                "arrays": json.loads(arrays)}
+
+    def get(self, params):
+        """Return the record of a run with the current code version or None."""
+        row = self._db.execute("SELECT * FROM runs WHERE key = ?",
+                               (self.key(params),)).fetchone()
+        return None if row is None else self._record(row)
+
+    def __contains__(self, params):
+        return self.get(params) is not None
+
+    def put(self, params, metrics, arrays=None):
+        """
+        Store a run, replacing a previous run with the same parameters.
+        metrics is a JSON serialisable dict, arrays maps names to numpy arrays.
+        Returns the record.
+        """
+
+        key = self.key(params)
+        arrays = arrays or {}
+        # write blobs before the index so that indexed runs are always complete
+        for name, array in arrays.items():
+            fname = self.path/"blobs"/f"{key}.{name}.npy"
+            tmp = fname.with_suffix(".tmp")
+            with open(tmp, "wb") as outf:
+                np.save(outf, np.asarray(array))
+            os.replace(tmp, fname)
+
+        record = {"key": key, "version": self.version, "created": time.time(),
+                  "params": params, "metrics": metrics, "arrays": sorted(arrays)}
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, self.version, record["created"], json.dumps(params),
+                              json.dumps(metrics), json.dumps(record["arrays"])))
+            for table, values in (("params", params), ("metrics", metrics)):
+                self._db.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+                self._db.executemany(f"INSERT INTO {table} VALUES (?, ?, ?)",
+                                     [(key, name, value) for name, value
+                                      in _numeric_items(values)])
+        return record
+
+    def compute(self, params, func):
+        """
+        Return the stored record for params, call func(params) only if there is none.
+        func returns (metrics, arrays) like the arguments of put.
+        """
+
+        record = self.get(params)
+        if record is None:
+            metrics, arrays = func(params)
+            record = self.put(params, metrics, arrays)
+        return record
+
+    def load(self, record, name, mmap=True):
+        """Load an array of a run given by its record or key, memory-mapped if mmap."""
+        key = record if isinstance(record, str) else record["key"]
+        return np.load(self.path/"blobs"/f"{key}.{name}.npy", mmap_mode="r" if mmap else None)
+
+    def find(self, version=True, metrics=None, **ranges):
+        """
+        Return records of all runs whose numeric parameters are in given ranges.
+
+        Arguments:
+            version: Code version of the runs, True for the current one, None for any.
+            metrics: dict of ranges of metrics, see ranges.
+            ranges: Parameter name -> value or (low, high), either bound may be None.
+        Raises:
+            ValueError if a bound is not a number, only numeric values are indexed.
+        Example:
+            store.find(beta=(1e6, 2e6), nsteps=(10, None), alpha=0)
+        """
+
+        query = "SELECT * FROM runs WHERE 1"
+        args = []
+        if version is not None:
+            query += " AND version = ?"
+            args.append(self.version if version is True else version)
+        for table, conditions in (("params", ranges), ("metrics", metrics or {})):
+            for name, bounds in conditions.items():
+                low, high = bounds if isinstance(bounds, (tuple, list)) else (bounds, bounds)
+                for bound in (low, high):
+                    if bound is not None and (not isinstance(bound, numbers.Real)
+                                              or isinstance(bound, bool)):
+                        raise ValueError(f"Range of {name} must be numeric, got {bound!r}")
+                query += f" AND key IN (SELECT key FROM {table} WHERE name = ?"
+                args.append(name)
+                if low is not None:
+                    query += " AND value >= ?"
+                    args.append(float(low))
+                if high is not None:
+                    query += " AND value <= ?"
+                    args.append(float(high))
+                query += ")"
+        query += " ORDER BY created"
+        return [self._record(row) for row in self._db.execute(query, args)]
+
+    def remove(self, record):
+        """Delete a run given by its record or key and its arrays."""
+        key = record if isinstance(record, str) else record["key"]
+        with self._db:
+            for table in ("runs", "params", "metrics"):
+                self._db.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+        for fname in (self.path/"blobs").glob(f"{key}.*.npy"):
+            fname.unlink()
@@ -1,15 +1,15 @@
 import numpy as np
 import numba
 
-@numba.jit(nopython=True)
+@numba.jit(nopython=True, cache=True)
 def cart2pol(cartesian):
     return np.array((np.linalg.norm(cartesian), np.arctan2(cartesian[1], cartesian[0])))
 
-@numba.jit(nopython=True)
+@numba.jit(nopython=True, cache=True)
 def pol2cart(polar):
     return polar[0] * np.array((np.cos(polar[1]), np.sin(polar[1])))
 
-@numba.jit(nopython=True)
+@numba.jit(nopython=True, cache=True)
 def radial_transform(point, centre, rs, pow0=1, pow1=1):
     relative = point - centre
     r, phi = cart2pol(relative)
@@ -59,6 +59,45 @@ def flamm_projection(points, centre, rs, ref_point, screen=0, camera=None):
 
     return projected
 
+# nogil: runs in the worker thread of the animation concurrently with Tk
+@numba.jit(nopython=True, cache=True, nogil=True)
+def _flamm_projection_screen(points, centre, rs, ref_depth, screen, camera, scale, shift, out):
+    for i in range(points.shape[0]):
+        dx = points[i, 0] - centre[0]
+        dy = points[i, 1] - centre[1]
+        r = np.sqrt(dx*dx + dy*dy)
+        if r <= rs:
+            out[i, 0] = np.nan
+            out[i, 1] = np.nan
+            continue
+
+        depth = 2*np.sqrt(rs*(r-rs)) - ref_depth
+        depth_scale = abs((screen-camera[2])/(depth-camera[2]))
+        for j in range(2):
+            projected = camera[j] + (points[i, j]-camera[j])*depth_scale
+            out[i, j] = projected*scale[j] + shift[j]
+
+def flamm_projection_screen(points, centre, rs, ref_point, scale, shift, screen=0,
+                            camera=None, out=None):
+    """
+    Same as flamm_projection followed by point*scale + shift but in one pass
+    without intermediate arrays. Returns a plain array with NaN for masked points.
+    """
+
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    if camera is None:
+        camera = np.array((*centre, 1))
+    if out is None:
+        out = np.empty_like(points)
+
+    ref_depth = flamm_depth(np.linalg.norm(ref_point - centre), rs)
+    _flamm_projection_screen(points, np.asarray(centre, dtype=np.float64), float(rs),
+                             float(ref_depth), float(screen),
+                             np.asarray(camera, dtype=np.float64),
+                             np.asarray(scale, dtype=np.float64),
+                             np.asarray(shift, dtype=np.float64), out)
+    return out
+
 def make_grid(p0, p1, nlines, resolution):
     return (np.array([[(x, y) for x in np.linspace(p0[0], p1[0], resolution[0])]
                      for y in np.linspace(p0[1], p1[1], nlines[0])]),
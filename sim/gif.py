@@ -0,0 +1,279 @@
+"""
+Encode animated GIFs one frame at a time.
+
+GifWriter writes every frame as soon as the next one arrives, so memory use
+does not grow with the length of the animation. Frames are stored as the
+difference to the previous frame: only the bounding box of changed pixels is
+encoded and unchanged pixels in it are transparent. Identical consecutive
+frames extend the duration of the previous frame instead of being stored.
+"""
+
+import struct
+
+import numba
+import numpy as np
+
+## Palette index of transparent pixels, frames use at most the other 255 colours.
+TRANSPARENT = 255
+
+## Maximum number of LZW codes allowed by the GIF format.
+_MAX_CODES = 4096
+
+
+@numba.jit(nopython=True, cache=True, nogil=True)
+def _emit(out, nbytes, buffer, nbits, code, code_size):
+    """Append code to the bit buffer and move complete bytes to out."""
+    buffer |= code << nbits
+    nbits += code_size
+    while nbits >= 8:
+        out[nbytes] = buffer & 0xff
+        nbytes += 1
+        buffer >>= 8
+        nbits -= 8
+    return nbytes, buffer, nbits
+
+@numba.jit(nopython=True, cache=True, nogil=True)
+def _lzw_encode(indices, min_code_size):
+    """LZW compress a 1D array of palette indices as GIF image data (without sub-blocks)."""
+
+    clear = 1 << min_code_size
+    eoi = clear + 1
+    # table[prefix, index] -> code of prefix+index, -1 if not in the table
+    table = np.full((_MAX_CODES, 1 << min_code_size), -1, dtype=np.int16)
+    # at most 12 bits per index plus clear codes
+    out = np.empty(2*len(indices) + 16, dtype=np.uint8)
+    nbytes = 0
+    buffer = np.int64(0)
+    nbits = 0
+
+    code_size = min_code_size + 1
+    next_code = eoi + 1
+
+    nbytes, buffer, nbits = _emit(out, nbytes, buffer, nbits, clear, code_size)
+
+    prefix = np.int64(indices[0])
+    for i in range(1, len(indices)):
+        index = indices[i]
+        code = table[prefix, index]
+        if code >= 0:
+            prefix = np.int64(code)
+            continue
+
+        nbytes, buffer, nbits = _emit(out, nbytes, buffer, nbits, prefix, code_size)
+
+        if next_code < _MAX_CODES:
+            table[prefix, index] = next_code
+            next_code += 1
+            # the decoder lags one code behind, grow when it needs the next bit
+            if next_code > (1 << code_size) and code_size < 12:
+                code_size += 1
+        else:
+            nbytes, buffer, nbits = _emit(out, nbytes, buffer, nbits, clear, code_size)
+            table[:] = -1
+            code_size = min_code_size + 1
+            next_code = eoi + 1
+        prefix = np.int64(index)
+
+    nbytes, buffer, nbits = _emit(out, nbytes, buffer, nbits, prefix, code_size)
+    nbytes, buffer, nbits = _emit(out, nbytes, buffer, nbits, eoi, code_size)
+    if nbits > 0:
+        out[nbytes] = buffer & 0xff
+        nbytes += 1
+
+    return out[:nbytes]
+
+def _sub_blocks(data):
+    """Split data into GIF sub-blocks of at most 255 bytes, terminated by an empty block."""
+    blocks = bytearray()
+    for start in range(0, len(data), 255):
+        chunk = data[start:start+255]
+        blocks.append(len(chunk))
+        blocks += chunk
+    blocks.append(0)
+    return bytes(blocks)
+
+def _pack(rgb):
+    """Return colours of an (..., 3) uint8 array as integers 0xRRGGBB."""
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+def _unpack(colours):
+    """Inverse of _pack, return an (..., 3) uint8 array."""
+    return np.stack(((colours >> 16) & 0xff, (colours >> 8) & 0xff, colours & 0xff),
+                    axis=-1).astype(np.uint8)
+
+def uniform_palette():
+    """Return a palette with 6x7x6 evenly spaced colours for use by several animations."""
+    red, green, blue = np.meshgrid(np.linspace(0, 255, 6), np.linspace(0, 255, 7),
+                                   np.linspace(0, 255, 6), indexing="ij")
+    return np.stack((red.ravel(), green.ravel(), blue.ravel()), axis=1).round().astype(np.uint8)
+
+def adaptive_palette(rgb):
+    """Return the (at most 255) most frequent colours of an image as a palette."""
+    colours, counts = np.unique(_pack(rgb).ravel(), return_counts=True)
+    return _unpack(colours[np.argsort(counts)[::-1][:TRANSPARENT]])
+
+
+class GifWriter:
+    """
+    Write an animated GIF frame by frame.
+
+    Usage:
+        with GifWriter("anim.gif", fps=30) as gif:
+            for image in images:
+                gif.add_frame(image)
+    """
+
+    def __init__(self, fname, fps=60, palette=None, loop=0):
+        """
+        Arguments:
+            fname: Output file, is written while frames are added.
+            fps: Frames per second, GIF delays are rounded to 1/100 s.
+            palette: (N, 3) uint8 array of at most 255 colours shared by all frames.
+                     If None, the palette is adaptive: it starts with the colours of
+                     the first frame and new colours of later frames are added as
+                     long as there is space, frames then carry a local colour table.
+                     Colours not in the palette are replaced by the closest ones.
+            loop: Number of times to play the animation, 0 loops forever.
+        """
+
+        if palette is not None and len(palette) > TRANSPARENT:
+            raise ValueError(f"Palette can hold at most {TRANSPARENT} colours")
+
+        self.fname = fname
+        self.fps = fps
+        self.palette = None if palette is None else np.asarray(palette, dtype=np.uint8)
+        self._adaptive = palette is None
+        self.loop = loop
+        self.nframes = 0
+
+        self._file = open(fname, "wb")
+        self._size = None
+        # number of colours in the global colour table
+        self._global_colours = 0
+        # packed colour -> palette index
+        self._lookup = {}
+        # packed colours of the previous frame
+        self._previous = None
+        # (left, top, width, height, transparent, ncolours, data) of the frame that
+        # waits for its delay
+        self._pending = None
+        self._pending_start = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _colour_table(self, ncolours):
+        """Return the first ncolours of the palette as a colour table with 256 entries."""
+        table = np.zeros((256, 3), dtype=np.uint8)
+        table[:ncolours] = self.palette[:ncolours]
+        return table.tobytes()
+
+    def _write_header(self, width, height):
+        self._global_colours = len(self.palette)
+        self._file.write(b"GIF89a")
+        # global colour table with 2^(7+1) entries
+        self._file.write(struct.pack("<HHBBB", width, height, 0xf7, 0, 0))
+        self._file.write(self._colour_table(self._global_colours))
+        self._file.write(b"\x21\xff\x0bNETSCAPE2.0" + struct.pack("<BBHB", 3, 1, self.loop, 0))
+
+    def _quantise(self, colours):
+        """Return palette indices of an array of packed colours."""
+
+        unique, inverse = np.unique(colours.ravel(), return_inverse=True)
+        indices = np.empty(len(unique), dtype=np.uint8)
+        missing = []
+        for i, colour in enumerate(unique.tolist()):
+            index = self._lookup.get(colour)
+            if index is None:
+                missing.append(i)
+            else:
+                indices[i] = index
+        if missing and self._adaptive and len(self.palette) < TRANSPARENT:
+            # add new colours to the palette while there is space
+            added = np.array(missing[:TRANSPARENT - len(self.palette)])
+            indices[added] = np.arange(len(self.palette), len(self.palette) + len(added))
+            self.palette = np.concatenate((self.palette, _unpack(unique[added])))
+            self._lookup.update(zip(unique[added].tolist(), indices[added].tolist()))
+            missing = missing[len(added):]
+        if missing:
+            # map remaining colours to the closest palette colour
+            missing = np.array(missing)
+            distances = ((_unpack(unique[missing])[:, np.newaxis, :].astype(float)
+                          - self.palette[np.newaxis, :, :].astype(float))**2).sum(axis=2)
+            indices[missing] = distances.argmin(axis=1)
+            self._lookup.update(zip(unique[missing].tolist(), indices[missing].tolist()))
+        return indices[inverse].reshape(colours.shape)
+
+    def add_frame(self, rgb):
+        """Add a frame given as (height, width, 3) uint8 array."""
+
+        rgb = np.asarray(rgb, dtype=np.uint8)
+        height, width = rgb.shape[:2]
+        if self._size is None:
+            self._size = (width, height)
+            if self.palette is None:
+                self.palette = adaptive_palette(rgb)
+            self._lookup = dict(zip(_pack(self.palette).tolist(), range(len(self.palette))))
+            self._write_header(width, height)
+        elif self._size != (width, height):
+            raise ValueError(f"Frame size {(width, height)} differs from {self._size}")
+
+        colours = _pack(rgb)
+        self.nframes += 1
+
+        if self._previous is None:
+            self._flush(self.nframes - 1)
+            indices = self._quantise(colours)
+            self._pending = (0, 0, width, height, False, len(self.palette),
+                             _lzw_encode(indices.ravel(), 8).tobytes())
+            self._previous = colours
+            return
+
+        changed = colours != self._previous
+        rows = np.flatnonzero(changed.any(axis=1))
+        if len(rows) == 0:
+            # same image, extend the delay of the pending frame
+            return
+        cols = np.flatnonzero(changed.any(axis=0))
+        top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+        # only quantise and encode the bounding box of the changes
+        region = self._quantise(colours[top:bottom, left:right])
+        region[~changed[top:bottom, left:right]] = TRANSPARENT
+        self._flush(self.nframes - 1)
+        self._pending = (left, top, right - left, bottom - top, True, len(self.palette),
+                         _lzw_encode(region.ravel(), 8).tobytes())
+        self._previous = colours
+
+    def _flush(self, end):
+        """Write the pending frame which lasts until frame number end."""
+
+        if self._pending is not None:
+            left, top, width, height, transparent, ncolours, data = self._pending
+            # round start and end times instead of durations to avoid drift
+            delay = round(end * 100 / self.fps) - round(self._pending_start * 100 / self.fps)
+            # keep the previous frame (disposal method 1) and mark transparency
+            self._file.write(struct.pack("<BBBBHBB", 0x21, 0xf9, 4, (1 << 2) | transparent,
+                                         delay, TRANSPARENT, 0))
+            if ncolours > self._global_colours:
+                # local colour table with 256 entries
+                self._file.write(struct.pack("<BHHHHB", 0x2c, left, top, width, height, 0x87))
+                self._file.write(self._colour_table(ncolours))
+            else:
+                self._file.write(struct.pack("<BHHHHB", 0x2c, left, top, width, height, 0))
+            self._file.write(b"\x08" + _sub_blocks(data))
+            self._pending = None
+        self._pending_start = end
+
+    def close(self):
+        """Write the last frame and finish the file."""
+        if self._file.closed:
+            return
+        self._flush(self.nframes)
+        self._file.write(b"\x3b")
+        self._file.close()
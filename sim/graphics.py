@@ -1,3 +1,5 @@
+import functools
+
 import numpy as np
 from colour import Color as Colour
 
@@ -18,6 +20,11 @@ COLOURS = {
 COLOUR_ALIASES = {name[5:]: name for name in COLOURS.keys()}
 
 
+## Maximum number of colour specifications kept in the resolver caches.
+COLOUR_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=COLOUR_CACHE_SIZE)
 def norm_colour(colour):
     """Resolve colour aliases."""
     if colour is None:
@@ -25,14 +32,52 @@ def norm_colour(colour):
     return "!".join((COLOUR_ALIASES[elem] if elem in COLOUR_ALIASES else elem
                      for elem in colour.split("!")))
 
+def _base_rgb(name):
+    """Return RGB of a single (not mixed) colour name or hex value."""
+    if name in COLOURS:
+        return COLOURS[name].rgb
+    # raises ValueError if the name is unknown
+    return Colour(name).rgb
+
+@functools.lru_cache(maxsize=COLOUR_CACHE_SIZE)
+def rgb_colour(colour):
+    """
+    Return RGB tuple (components in [0, 1]) of a colour string.
+
+    Understands xcolor-style mixes 'a!p!b' (p percent of a, rest b) including chains
+    like 'a!p!b!q!c'. A missing trailing colour ('a!p') means mixing with white.
+    Raises ValueError if any component is unknown.
+    """
+
+    elements = norm_colour(colour).split("!")
+    rgb = _base_rgb(elements[0])
+    for i in range(1, len(elements), 2):
+        frac = float(elements[i]) / 100
+        other = _base_rgb(elements[i+1]) if i+1 < len(elements) else (1., 1., 1.)
+        rgb = tuple(frac*own + (1-frac)*oth for own, oth in zip(rgb, other))
+    return rgb
+
+@functools.lru_cache(maxsize=COLOUR_CACHE_SIZE)
+def _hex_colour_str(colour):
+    """Hex value of a colour string, see hex_colour."""
+    if "!" not in colour and norm_colour(colour) not in COLOURS:
+        # leave plain names to the backend
+        return colour
+    try:
+        return "#{:02x}{:02x}{:02x}".format(*(round(c*255) for c in rgb_colour(colour)))
+    except ValueError:
+        return colour
+
 def hex_colour(colour):
-    """Return hex value of a colour if it is known (in COLOURS) or an instance of Colour."""
+    """
+    Return hex value of a colour if it is known (in COLOURS), a mix of known colours,
+    or an instance of Colour. Other colours are returned unchanged.
+    """
+    if colour is None:
+        return colour
     if isinstance(colour, Colour):
         return colour.hex_l
-    try:
-        return COLOURS[norm_colour(colour)].hex_l
-    except KeyError:
-        return colour
+    return _hex_colour_str(colour)
 
 class Transform:
     """
@@ -52,9 +97,19 @@ class Transform:
         self.screen_upper = np.array(screen_upper)
         self.screen_z = screen_z
 
+        # extends do not change, compute them once
+        self._world_extends = np.array((self.world_width(), self.world_height()), dtype=float)
+        self._screen_extends = np.array((self.screen_width(), self.screen_height()),
+                                        dtype=float)
+        self._world_extends.flags.writeable = False
+        self._screen_extends.flags.writeable = False
+
         # factor and summand for transformation world -> screen
-        self._w2s_scale = self.screen_extends() / self.world_extends()
+        self._w2s_scale = self._screen_extends / self._world_extends
         self._w2s_shift = self.screen_lower - self.world_lower * self._w2s_scale
+        # factor and summand for transformation screen -> world
+        self._s2w_scale = 1 / self._w2s_scale
+        self._s2w_shift = -self._w2s_shift * self._s2w_scale
 
     def world_width(self):
         return self.world_upper[0] - self.world_lower[0]
@@ -63,7 +118,8 @@ class Transform:
         return self.world_upper[1] - self.world_lower[1]
 
     def world_extends(self):
-        return np.array((self.world_width(), self.world_height()))
+        """Return (read-only) array of width and height of world space."""
+        return self._world_extends
 
     def screen_width(self):
         return self.screen_upper[0] - self.screen_lower[0]
@@ -72,7 +128,35 @@ class Transform:
         return self.screen_upper[1] - self.screen_lower[1]
 
     def screen_extends(self):
-        return np.array((self.screen_width(), self.screen_height()))
+        """Return (read-only) array of width and height of screen space."""
+        return self._screen_extends
 
-    def world2screen(self, point):
-        return point * self._w2s_scale + self._w2s_shift
+    def world2screen(self, point, out=None):
+        """
+        Transform a point or (N, 2) array of points from world to screen space.
+        If given, the result is written to out which may be point itself.
+        """
+        if out is None:
+            return point * self._w2s_scale + self._w2s_shift
+        np.multiply(point, self._w2s_scale, out=out)
+        return np.add(out, self._w2s_shift, out=out)
+
+    def screen2world(self, point, out=None):
+        """
+        Transform a point or (N, 2) array of points from screen to world space.
+        If given, the result is written to out which may be point itself.
+        """
+        if out is None:
+            return point * self._s2w_scale + self._s2w_shift
+        np.multiply(point, self._s2w_scale, out=out)
+        return np.add(out, self._s2w_shift, out=out)
+
+    def flamm2screen(self, points, centre, rs, ref_point, screen=0, camera=None, out=None):
+        """
+        Project world points with geometry.flamm_projection and transform the
+        result to screen space in a single pass.
+        Points that are masked by flamm_projection are NaN in the output.
+        """
+        from .geometry import flamm_projection_screen
+        return flamm_projection_screen(points, centre, rs, ref_point, self._w2s_scale,
+                                       self._w2s_shift, screen, camera, out)
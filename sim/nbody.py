@@ -0,0 +1,206 @@
+"""
+N-body simulation of the Sun, Mercury, and other planets.
+
+All bodies are stored in contiguous arrays and pairwise forces are computed in
+a compiled kernel. The GR correction of physics.acceleration is applied to
+all forces between the central body (the Sun) and the other bodies.
+"""
+
+import numpy as np
+import numba
+
+from .geometry import pol2cart
+from .physics import CBody, RS, RL2
+
+## Gravitational parameters (GM) of the planets relative to the Sun.
+PLANET_MASS_RATIOS = {
+    "mercury": 1.660e-7,
+    "venus": 2.448e-6,
+    "earth": 3.040e-6,  # including the moon
+    "mars": 3.227e-7,
+    "jupiter": 9.548e-4,
+    "saturn": 2.859e-4,
+    "uranus": 4.366e-5,
+    "neptune": 5.151e-5,
+}
+
+## Semi-major axes of the planets in units of R0.
+PLANET_RADII = {
+    "venus": 10.82,
+    "earth": 14.96,
+    "mars": 22.79,
+    "jupiter": 77.85,
+    "saturn": 143.4,
+    "uranus": 287.1,
+    "neptune": 449.5,
+}
+
+
+class NBody:
+    """
+    Positions, velocities, and gravitational parameters of N bodies.
+
+    Attributes:
+        x: (N, 2) array of positions.
+        v: (N, 2) array of velocities.
+        gm: (N,) array of gravitational parameters, in units of R0**3/T0**2,
+            same units as CBody.acc.
+        central: Index of the central body (the Sun) used for the GR correction.
+        names: List of names of the bodies.
+    """
+
+    def __init__(self, x, v, gm, central=0, names=None):
+        self.x = np.ascontiguousarray(x, dtype=float)
+        self.v = np.ascontiguousarray(v, dtype=float)
+        self.gm = np.ascontiguousarray(gm, dtype=float)
+        self.central = central
+        self.names = list(names) if names is not None else [str(i) for i in range(len(gm))]
+
+        if self.x.shape != self.v.shape or self.x.shape != (len(self.gm), 2):
+            raise ValueError(f"Shapes of x {self.x.shape}, v {self.v.shape}, "
+                             f"and gm {self.gm.shape} do not match")
+
+    def __len__(self):
+        return len(self.gm)
+
+    def copy(self):
+        return NBody(self.x.copy(), self.v.copy(), self.gm.copy(), self.central, self.names)
+
+    def index(self, name):
+        """Return the index of a body by name."""
+        return self.names.index(name)
+
+    def body(self, index):
+        """
+        Return a CBody with the state of a body relative to the central body.
+        Index can be an int or a name.
+        """
+        if isinstance(index, str):
+            index = self.index(index)
+        return CBody(self.x[index] - self.x[self.central],
+                     self.v[index] - self.v[self.central],
+                     self.gm[self.central])
+
+    def centre_momentum(self):
+        """Adjust the velocity of the central body such that the total momentum vanishes."""
+        others = np.arange(len(self)) != self.central
+        self.v[self.central] = -np.sum(self.gm[others, np.newaxis] * self.v[others], axis=0) \
+            / self.gm[self.central]
+
+    @classmethod
+    def from_bodies(cls, sun, bodies, masses, names=None):
+        """
+        Construct from a central CBody and a list of other CBody's.
+        masses are the gravitational parameters of the other bodies.
+        The central body's gravitational parameter is taken from the first body's acc.
+        """
+        x = [sun.x, *(body.x for body in bodies)]
+        v = [sun.v, *(body.v for body in bodies)]
+        gm = [bodies[0].acc if bodies else 1, *masses]
+        return cls(np.array(x), np.array(v), np.array(gm), 0,
+                   ["sun", *names] if names is not None else None)
+
+    @classmethod
+    def solar_system(cls, phases=None, planets=None):
+        """
+        Construct the Sun, Mercury, and other planets.
+
+        The other planets move on circular orbits initially.
+
+        Arguments:
+            phases: dict of initial angles of planets, defaults to 0 for all.
+            planets: Names of planets besides Mercury to include, defaults to all
+                     in PLANET_RADII.
+        """
+
+        if phases is None:
+            phases = {}
+        if planets is None:
+            planets = PLANET_RADII.keys()
+
+        mercury = CBody.mercury(phases.get("mercury", 0))
+        gm_sun = mercury.acc
+        bodies = [mercury]
+        masses = [gm_sun * PLANET_MASS_RATIOS["mercury"]]
+        for name in planets:
+            radius = PLANET_RADII[name]
+            phi = phases.get(name, 0)
+            bodies.append(CBody(pol2cart((radius, phi)),
+                                pol2cart((np.sqrt(gm_sun / radius), phi+np.pi/2)),
+                                gm_sun))
+            masses.append(gm_sun * PLANET_MASS_RATIOS[name])
+
+        system = cls.from_bodies(CBody.sun(), bodies, masses, ["mercury", *planets])
+        system.centre_momentum()
+        return system
+
+
+@numba.jit(nopython=True, cache=True)
+def _accelerations(x, gm, central, alpha, beta, out):
+    """Compute accelerations of all bodies into out."""
+    n = x.shape[0]
+    out[:, :] = 0
+    for i in range(n):
+        for j in range(i+1, n):
+            dx = x[j, 0] - x[i, 0]
+            dy = x[j, 1] - x[i, 1]
+            r2 = dx*dx + dy*dy
+            r = np.sqrt(r2)
+            fact = 1 / (r2*r)
+            if i == central or j == central:
+                fact *= 1 + alpha * RS / r + beta * RL2 / r2
+            out[i, 0] += gm[j] * fact * dx
+            out[i, 1] += gm[j] * fact * dy
+            out[j, 0] -= gm[i] * fact * dx
+            out[j, 1] -= gm[i] * fact * dy
+
+@numba.jit(nopython=True, cache=True)
+def _advance(x, v, gm, central, dt, nsteps, alpha, beta, tracked, track_out):
+    """
+    Advance x and v in place using the same integrator as physics.advance.
+    If tracked >= 0, store the position of that body relative to the central
+    body after each step in track_out.
+    """
+    acc = np.empty_like(x)
+    for step in range(nsteps):
+        _accelerations(x, gm, central, alpha, beta, acc)
+        for i in range(x.shape[0]):
+            v[i, 0] += acc[i, 0] * dt
+            v[i, 1] += acc[i, 1] * dt
+            x[i, 0] += v[i, 0] * dt
+            x[i, 1] += v[i, 1] * dt
+        if tracked >= 0:
+            track_out[step, 0] = x[tracked, 0] - x[central, 0]
+            track_out[step, 1] = x[tracked, 1] - x[central, 1]
+
+def advance_nbody(system, length, nsteps, alpha, beta, tracker=None, tracked="mercury"):
+    """
+    Advance an NBody system for some trajectory length and given number of time steps.
+
+    Arguments:
+        system: NBody to advance, is not modified.
+        length, nsteps, alpha, beta: Same as for physics.advance.
+        tracker: ExtremaTracker that is fed the position of body tracked relative
+                 to the central body after every step. Its reference point should
+                 therefore be the origin.
+        tracked: Index or name of the body to track.
+    Returns:
+        New NBody with the advanced state.
+    """
+
+    system = system.copy()
+    dt = length / nsteps
+
+    if tracker is None:
+        _advance(system.x, system.v, system.gm, system.central, dt, nsteps,
+                 alpha, beta, -1, np.empty((0, 2)))
+    else:
+        if isinstance(tracked, str):
+            tracked = system.index(tracked)
+        track_out = np.empty((nsteps, 2))
+        _advance(system.x, system.v, system.gm, system.central, dt, nsteps,
+                 alpha, beta, tracked, track_out)
+        for point in track_out:
+            tracker.add_point(point)
+
+    return system
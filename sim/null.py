@@ -0,0 +1,39 @@
+"""
+Backend that draws nothing.
+
+Has the same interface as tk.Tk and can be used to run animations without
+a display or to skip rendering altogether.
+"""
+
+class Null:
+    def __init__(self, transform, background=None):
+        self.transform = transform
+        self.background = background
+
+    def clear(self, objects="all"):
+        """Delete given objects, does nothing."""
+
+    def update(self):
+        """Update the display, does nothing."""
+
+    def lower(self, tag, below):
+        """Move objects with given tag below other objects, does nothing."""
+
+    def draw_background(self):
+        """Draw the background, does nothing."""
+
+    def circle(self, pos, radius, fill, draw=None, tags=None):
+        """Draw a circle, does nothing."""
+
+    def update_circles(self, gids, positions, radii):
+        """Move and resize existing circles, does nothing."""
+
+    def recolour(self, gid, fill, draw=None, pos=None, radius=None):
+        """Change the colours of an existing circle, does nothing."""
+
+    def line(self, points, draw, lw=1, tags=None, screen=False):
+        """Draw a line, does nothing."""
+        return []
+
+    def ping(self, pos, colour, radius_final=None, radius_initial=None, nframes=10):
+        """Place an animated ping, does nothing."""
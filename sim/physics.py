@@ -1,10 +1,9 @@
+import abc
 import dataclasses
-import copy
+import math
 
 import numpy as np
 
-from .geometry import pol2cart
-
 
 # Schwarzschild radius of Sun, in units of R0
 RS = 2.95e-7
@@ -14,11 +13,25 @@ RL2 = 8.19e-7
 
 @dataclasses.dataclass
 class CBody:
+    __slots__ = ("x", "v", "acc")
+
     x: np.ndarray
     v: np.ndarray
 
     acc: float
 
+    @classmethod
+    def view(cls, state, acc):
+        """
+        Construct a body whose x and v are views into state = (x, y, vx, vy).
+        Use with advance(..., out=body) to write results directly into a shared array.
+        """
+        return cls(state[:2], state[2:4], acc)
+
+    def copy(self):
+        """Return a copy with its own (float) arrays."""
+        return CBody(np.array(self.x, dtype=float), np.array(self.v, dtype=float), self.acc)
+
     @classmethod
     def mercury(cls, phi=0):
         # Values computed using https://nssdc.gsfc.nasa.gov/planetary/factsheet
@@ -26,8 +39,9 @@ class CBody:
         VM0 = 5.10e-1 # Initial orbital speed of Mercury, in units of R0/T0
         AM = 9.90e-1  # Base acceleration of Mercury, in units of R0**3/T0**2
 
-        return cls(pol2cart((RM0, phi)),
-                   pol2cart((VM0, phi+np.pi/2)),
+        # avoid geometry.pol2cart to not require numba for pure physics
+        return cls(RM0 * np.array((np.cos(phi), np.sin(phi))),
+                   VM0 * np.array((-np.sin(phi), np.cos(phi))),
                    AM)
 
     @classmethod
@@ -44,18 +58,105 @@ def acceleration(body, alpha, beta):
     # compute the acceleration
     return -body.acc * grfact / r**2 * body.x / r
 
-def advance(body, length, nsteps, alpha, beta, tracker=None):
-    """Advance a body for some trajectory length and given number of time steps."""
+def energy(x, v, acc, alpha=0.0, beta=0.0):
+    """
+    Specific orbital energy for positions x and velocities v of shape (2,) or (N, 2).
+    Includes the potential of the GR terms of acceleration(), so it is conserved
+    along exact orbits.
+    """
+    x, v = np.asarray(x), np.asarray(v)
+    r = np.hypot(x[..., 0], x[..., 1])
+    return (v[..., 0]**2 + v[..., 1]**2) / 2 \
+        - acc / r * (1 + alpha * RS / (2*r) + beta * RL2 / (3*r**2))
+
+def angular_momentum(x, v):
+    """Specific angular momentum for positions x and velocities v of shape (2,) or (N, 2)."""
+    x, v = np.asarray(x), np.asarray(v)
+    return x[..., 0]*v[..., 1] - x[..., 1]*v[..., 0]
+
+def _integrate(body, dt, nsteps, alpha, beta, tracker):
+    """
+    Advance body in place by nsteps steps of size dt.
+    Performs the same operations as acceleration() but on scalars to avoid
+    allocating arrays in every step.
+    """
+
+    x, y = float(body.x[0]), float(body.x[1])
+    vx, vy = float(body.v[0]), float(body.v[1])
+    acc = body.acc
 
-    # need an internal copy to manipulate, keep argument as it is
-    body = copy.deepcopy(body)
-
-    dt = length / nsteps
     for _ in range(nsteps):
-        body.v += acceleration(body, alpha, beta)*dt
-        body.x += body.v*dt
+        r = math.sqrt(x*x + y*y)
+        # compute the factor coming from General Relativity
+        grfact = 1 + alpha * RS / r + beta * RL2 / r**2
+        fact = -acc * grfact / r**2
+        vx += fact * x / r * dt
+        vy += fact * y / r * dt
+        x += vx*dt
+        y += vy*dt
 
         if tracker is not None:
+            body.x[0] = x
+            body.x[1] = y
+            body.v[0] = vx
+            body.v[1] = vy
             tracker.add_point(body)
 
-    return body
+    body.x[0] = x
+    body.x[1] = y
+    body.v[0] = vx
+    body.v[1] = vy
+
+def advance(body, length, nsteps, alpha, beta, tracker=None, out=None):
+    """
+    Advance a body for some trajectory length and given number of time steps.
+
+    Returns a new body and leaves the argument as it is unless out is given.
+    In that case, the result is written into out and out is returned.
+    out may be body itself to advance in place.
+    """
+
+    if out is None:
+        out = body.copy()
+    elif out is not body:
+        out.x[:] = body.x
+        out.v[:] = body.v
+        out.acc = body.acc
+
+    _integrate(out, length / nsteps, nsteps, alpha, beta, tracker)
+    return out
+
+
+class ForceModel(abc.ABC):
+    """
+    Interface of force models.
+
+    A force model advances bodies, see ForceModel.advance.
+    Use ParametrisedGR for the model implemented by acceleration() and advance()
+    and relativity.Schwarzschild for exact relativistic orbits.
+    """
+
+    @abc.abstractmethod
+    def advance(self, body, length, nsteps, tracker=None, out=None):
+        """
+        Advance a body in nsteps steps.
+        The meaning of length is defined by the model.
+        Arguments tracker and out are the same as for advance().
+        """
+
+
+class ParametrisedGR(ForceModel):
+    """
+    Newtonian gravity with GR factor 1 + alpha*RS/r + beta*RL2/r**2.
+    length is the time to advance by.
+    """
+
+    def __init__(self, alpha=0.0, beta=0.0):
+        self.alpha = alpha
+        self.beta = beta
+
+    def acceleration(self, body):
+        return acceleration(body, self.alpha, self.beta)
+
+    def advance(self, body, length, nsteps, tracker=None, out=None):
+        return advance(body, length, nsteps, self.alpha, self.beta, tracker, out)
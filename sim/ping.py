@@ -1,22 +1,44 @@
 """
-Class Ping to mark a location.
+Class PingManager to mark locations.
 """
 
-from .util import interpolate
+import numpy as np
 
-class Ping:
+class PingManager:
     """
-    Mark a location.
+    Animate many pings at once.
 
-    Displays a ring around some position and changes the radius of the
-    ring for every frame until a final radius is reached.
-    Then, switches to a filled circle with the target radius.
+    A ping marks a location with a ring around it whose radius changes every
+    frame until a final radius is reached. Then, it switches to a filled circle
+    with that radius.
 
-    Call Ping.draw() to initially draw and update the ping.
+    The animated radii are kept in arrays that are updated with one vectorised
+    step per frame. Existing circles are moved instead of redrawn and finished
+    pings are retired, i.e. they stay on display but cost nothing in subsequent
+    frames.
+
+    Call PingManager.update() exactly once per frame.
     """
 
-    def __init__(self, position, colour, radius_final, radius_initial, nframes):
+    def __init__(self):
+        self._positions = np.empty((0, 2))
+        self._radius_initial = np.empty(0)
+        self._radius_final = np.empty(0)
+        self._nframes = np.empty(0, dtype=int)
+        # number of times each ping has been drawn
+        self._frame = np.empty(0, dtype=int)
+        self._colours = []
+        # IDs of the circles or rings, None if not drawn yet
+        self._gids = []
+
+    def __len__(self):
+        """Return the number of pings that are still animating."""
+        return len(self._gids)
+
+    def add(self, position, colour, radius_final, radius_initial, nframes):
         """
+        Add a new ping.
+
         Arguments:
             position: (numpy array) 2D position of the ping (centre).
             colour: Colour string.
@@ -24,62 +46,60 @@ class Ping:
             radius_initial: Radius of the ring at the beginning of the animation.
             nframes: Number of frames it takes to got from radius_initial to radius_final.
         """
-
-        self.position = position
-        self.colour = colour
-
-        # animation finished?
-        self._finished = False
-        # iteratator (animating) or float (finished)
-        self._radius = interpolate(radius_initial, radius_final, nframes)
-        # ID of the circle or ring
-        self._gid = None
-
-    def draw(self, anim, keep_finished=True):
-        """
-        Draw the ping into backend anim.
-        Every time this function is called, the previous ring/circle is
-        removed and replaced by one with modified radius.
-        Call this function exactly once per frame!
-        """
-
-        if self._finished and keep_finished and self._gid is not None:
-            # finished circle is already drawn
+        self._positions = np.concatenate((self._positions, np.reshape(position, (1, 2))))
+        self._radius_initial = np.append(self._radius_initial, radius_initial)
+        self._radius_final = np.append(self._radius_final, radius_final)
+        self._nframes = np.append(self._nframes, nframes)
+        self._frame = np.append(self._frame, 0)
+        self._colours.append(colour)
+        self._gids.append(None)
+
+    def radii(self):
+        """Return the radii of all animating pings in the current frame."""
+        finished = self._frame >= self._nframes
+        # same values as util.interpolate
+        step = (self._radius_final - self._radius_initial) / self._nframes
+        return np.where(finished, self._radius_final,
+                        self._radius_initial + self._frame*step)
+
+    def update(self, anim):
+        """Draw or update all animating pings into backend anim and retire finished ones."""
+
+        if not self._gids:
             return
 
-        anim.clear(self._gid)
-
-        # get the radius first to set self._finished properly
-        radius = self._get_radius()
-        if self._finished:
-            fill = self.colour
-            draw = None
-        else:
-            fill = None
-            draw = self.colour
-
-        self._gid = anim.circle(self.position, radius, fill, draw)
-
-    def clear(self, anim):
-        """Remove the ring/circle from display."""
-        anim.clear(self._gid)
-
-    def gid(self):
-        """Return the ID of the ring/circle, can be None if nothing has been drawn yet."""
-        return self._gid
-
-    def _get_radius(self):
-        """Return the next radius of the ring/circle, advances the radius iterator."""
-
-        if self._finished:
-            # self._radius is a float now
-            return self._radius
-
-        try:
-            # get next radius
-            return next(self._radius)
-        except StopIteration as stop:
-            # set internal state to 'finished'
-            self._radius = stop.value
-            self._finished = True
-            return self._radius
+        radii = self.radii()
+        finished = self._frame >= self._nframes
+
+        # move existing rings in one go, finishing ones are resized with their colour
+        drawn = np.array([gid is not None for gid in self._gids])
+        moving = drawn & ~finished
+        if moving.any():
+            anim.update_circles([gid for gid, m in zip(self._gids, moving) if m],
+                                self._positions[moving], radii[moving])
+
+        for i in np.flatnonzero(~drawn):
+            if finished[i]:
+                self._gids[i] = anim.circle(self._positions[i], radii[i], self._colours[i])
+            else:
+                self._gids[i] = anim.circle(self._positions[i], radii[i], None,
+                                            self._colours[i])
+        for i in np.flatnonzero(finished & drawn):
+            # switch from ring to filled circle
+            anim.recolour(self._gids[i], self._colours[i], self._colours[i],
+                          self._positions[i], radii[i])
+
+        self._frame += 1
+        self._retire(~finished)
+
+    def _retire(self, keep):
+        """Keep only pings where keep is True."""
+        if keep.all():
+            return
+        self._positions = self._positions[keep]
+        self._radius_initial = self._radius_initial[keep]
+        self._radius_final = self._radius_final[keep]
+        self._nframes = self._nframes[keep]
+        self._frame = self._frame[keep]
+        self._colours = [colour for colour, k in zip(self._colours, keep) if k]
+        self._gids = [gid for gid, k in zip(self._gids, keep) if k]
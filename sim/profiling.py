@@ -0,0 +1,193 @@
+"""
+Lightweight timing instrumentation for animation loops.
+
+Use Profiler to record named spans per phase, counters, and per-frame timings.
+Pass NULL_PROFILER, the default of functions that accept a profiler, to switch
+instrumentation off, all of its methods are no-ops.
+"""
+
+import contextlib
+import json
+import threading
+import time
+
+import numpy as np
+
+
+class _Span:
+    """Context manager that times a single span of a Profiler."""
+
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._profiler._add_span(self._name, self._start, time.perf_counter_ns())
+        return False
+
+
+class Profiler:
+    """
+    Record how long named phases take in each frame.
+
+    Wrap every frame in Profiler.frame() and phases within it in Profiler.span(name).
+    Spans with the same name are accumulated per frame.
+    Spans outside of frames are recorded as frames of their own.
+    Frames are tracked per thread, spans of a worker thread never end up in
+    the frames of the main thread.
+    """
+
+    def __init__(self, frame_budget=1/60, trace=False):
+        """
+        Arguments:
+            frame_budget: Time in seconds available for each frame.
+                          Frames that take longer are counted as dropped.
+            trace: If True, store every span for export as a Chrome trace.
+        """
+
+        self.frame_budget = frame_budget
+        self.trace = trace
+
+        # per phase: list of total durations per frame in ns
+        self._phases = {}
+        # total durations of all frames in ns
+        self._frames = []
+        # name -> count
+        self._counters = {}
+        # (name, start, end, thread id) for Chrome traces
+        self._events = []
+        # durations of phases in the current frame of each thread, None if not in a frame
+        self._local = threading.local()
+        self._t0 = time.perf_counter_ns()
+
+    def __bool__(self):
+        return True
+
+    def span(self, name):
+        """Return a context manager that times phase name."""
+        return _Span(self, name)
+
+    def count(self, name, n=1):
+        """Increment counter name by n."""
+        self._counters[name] = self._counters.get(name, 0) + n
+
+    @contextlib.contextmanager
+    def frame(self):
+        """Context manager that encloses a whole frame."""
+        current = self._local.current = {}
+        start = time.perf_counter_ns()
+        try:
+            yield self
+        finally:
+            end = time.perf_counter_ns()
+            self._frames.append(end - start)
+            if self.trace:
+                self._events.append(("frame", start, end, threading.get_ident()))
+            for name, duration in current.items():
+                self._phases.setdefault(name, []).append(duration)
+            self._local.current = None
+
+    def _add_span(self, name, start, end):
+        if self.trace:
+            self._events.append((name, start, end, threading.get_ident()))
+        current = getattr(self._local, "current", None)
+        if current is None:
+            self._phases.setdefault(name, []).append(end - start)
+        else:
+            current[name] = current.get(name, 0) + end - start
+
+    def dropped_frames(self):
+        """Return the number of frames that exceeded the frame budget."""
+        return int(np.count_nonzero(np.array(self._frames) > self.frame_budget * 1e9))
+
+    def summary(self):
+        """
+        Return a dict with statistics of all phases and frames.
+        Times are in seconds and refer to the total time spent in a phase in a frame.
+        """
+
+        def _stats(durations):
+            durations = np.array(durations) / 1e9
+            return {"count": len(durations),
+                    "total": float(durations.sum()),
+                    "p50": float(np.percentile(durations, 50)),
+                    "p95": float(np.percentile(durations, 95)),
+                    "max": float(durations.max())}
+
+        summary = {"phases": {name: _stats(durations)
+                              for name, durations in self._phases.items()},
+                   "counters": dict(self._counters)}
+        if self._frames:
+            summary["frames"] = _stats(self._frames)
+            summary["frames"]["dropped"] = self.dropped_frames()
+        return summary
+
+    def format_summary(self):
+        """Return the summary as a human readable table."""
+        summary = self.summary()
+        lines = [f"{'phase':<16}{'count':>8}{'total/s':>10}{'p50/ms':>10}"
+                 f"{'p95/ms':>10}{'max/ms':>10}"]
+        rows = list(summary["phases"].items())
+        if "frames" in summary:
+            rows.append(("frame", summary["frames"]))
+        for name, stats in rows:
+            lines.append(f"{name:<16}{stats['count']:>8}{stats['total']:>10.3f}"
+                         f"{stats['p50']*1e3:>10.3f}{stats['p95']*1e3:>10.3f}"
+                         f"{stats['max']*1e3:>10.3f}")
+        if "frames" in summary:
+            lines.append(f"dropped frames: {summary['frames']['dropped']}"
+                         f" of {summary['frames']['count']}")
+        for name, count in summary["counters"].items():
+            lines.append(f"{name}: {count}")
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, fname):
+        """
+        Write all recorded spans in Chrome's trace event format.
+        Open the file in chrome://tracing or https://ui.perfetto.dev.
+        Requires trace=True.
+        """
+
+        if not self.trace:
+            raise RuntimeError("Profiler was constructed with trace=False, no events recorded")
+
+        events = [{"name": name, "ph": "X", "pid": 0, "tid": tid,
+                   "ts": (start - self._t0) / 1e3, "dur": (end - start) / 1e3}
+                  for name, start, end, tid in self._events]
+        with open(fname, "w") as outf:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, outf)
+
+
+class NullProfiler:
+    """Profiler that records nothing, see Profiler for the interface."""
+
+    _span = contextlib.nullcontext()
+
+    def __bool__(self):
+        return False
+
+    def span(self, name):
+        return self._span
+
+    def count(self, name, n=1):
+        pass
+
+    def frame(self):
+        return self._span
+
+    def summary(self):
+        return {"phases": {}, "counters": {}}
+
+    def format_summary(self):
+        return ""
+
+
+## Shared instance of NullProfiler.
+NULL_PROFILER = NullProfiler()
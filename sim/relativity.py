@@ -0,0 +1,165 @@
+"""
+Exact relativistic orbits around a Schwarzschild mass.
+
+Integrates the Binet equation of Schwarzschild geodesics
+    u'' + u = GM/h**2 + 3 GM/c**2 u**2
+for u = 1/r as a function of the orbital angle phi, where h is the specific
+angular momentum. With GM/c**2 = RS/2, the GR term is 3/2 RS u**2.
+"""
+
+import numpy as np
+import numba
+
+from .physics import ForceModel, RS
+
+
+@numba.jit(nopython=True, cache=True)
+def _binet_rhs(u, w, k, eps):
+    """Return (u', w') of the Binet equation with w = u'."""
+    return w, k - u + eps*u*u
+
+@numba.jit(nopython=True, cache=True)
+def _rk4_step(u, w, dphi, k, eps):
+    du1, dw1 = _binet_rhs(u, w, k, eps)
+    du2, dw2 = _binet_rhs(u + dphi/2*du1, w + dphi/2*dw1, k, eps)
+    du3, dw3 = _binet_rhs(u + dphi/2*du2, w + dphi/2*dw2, k, eps)
+    du4, dw4 = _binet_rhs(u + dphi*du3, w + dphi*dw3, k, eps)
+    return (u + dphi/6*(du1 + 2*du2 + 2*du3 + du4),
+            w + dphi/6*(dw1 + 2*dw2 + 2*dw3 + dw4))
+
+@numba.jit(nopython=True, cache=True)
+def _integrate(u, w, phi, dphi, nsteps, k, eps, out):
+    """
+    Integrate nsteps RK4 steps of size dphi.
+    If out has nsteps rows, store (u, w, phi) after every step.
+    Returns final (u, w, phi).
+    """
+    store = out.shape[0] == nsteps
+    for step in range(nsteps):
+        u, w = _rk4_step(u, w, dphi, k, eps)
+        phi += dphi
+        if store:
+            out[step, 0] = u
+            out[step, 1] = w
+            out[step, 2] = phi
+    return u, w, phi
+
+@numba.jit(nopython=True, cache=True)
+def _find_perihelia(u, w, phi, dphi, nsteps, k, eps, out):
+    """
+    Integrate like _integrate and store the angles of all perihelia (w crosses
+    zero from above) in out, stops when out is full.
+    Perihelia are located by Newton iteration on the cubic Hermite interpolant of w.
+    Returns number of perihelia found.
+    """
+    nfound = 0
+    for _ in range(nsteps):
+        u1, w1 = _rk4_step(u, w, dphi, k, eps)
+        # sign of dphi is accounted for by comparing in direction of integration
+        if w*dphi > 0 and w1*dphi <= 0:
+            dw0 = k - u + eps*u*u
+            dw1 = k - u1 + eps*u1*u1
+            h = dphi
+            s = w / (w - w1)  # linear guess, fraction of the step
+            for _ in range(4):
+                s2 = s*s
+                s3 = s2*s
+                val = ((2*s3 - 3*s2 + 1)*w + (s3 - 2*s2 + s)*h*dw0
+                       + (-2*s3 + 3*s2)*w1 + (s3 - s2)*h*dw1)
+                der = ((6*s2 - 6*s)*w + (3*s2 - 4*s + 1)*h*dw0
+                       + (-6*s2 + 6*s)*w1 + (3*s2 - 2*s)*h*dw1)
+                if der == 0:
+                    break
+                s -= val / der
+            out[nfound] = phi + s*h
+            nfound += 1
+            if nfound == out.shape[0]:
+                return nfound
+        u, w = u1, w1
+        phi += dphi
+    return nfound
+
+
+class Schwarzschild(ForceModel):
+    """
+    Exact relativistic orbit of a test body around a mass at the origin with
+    Schwarzschild radius rs. The gravitational parameter is taken from CBody.acc.
+
+    length in advance() is the orbital angle to sweep in radians, not a time.
+    """
+
+    def __init__(self, rs=RS):
+        self.rs = rs
+
+    @staticmethod
+    def _to_binet(body):
+        """Return (u, w, phi, h) for a body."""
+        x, v = np.asarray(body.x, dtype=float), np.asarray(body.v, dtype=float)
+        r = np.hypot(x[0], x[1])
+        h = x[0]*v[1] - x[1]*v[0]
+        rdot = (x @ v) / r
+        return 1/r, -rdot/h, np.arctan2(x[1], x[0]), h
+
+    @staticmethod
+    def _to_cartesian(u, w, phi, h):
+        """Return position and velocity for Binet variables."""
+        radial = np.array((np.cos(phi), np.sin(phi)))
+        tangential = np.array((-np.sin(phi), np.cos(phi)))
+        return radial / u, -h*w*radial + h*u*tangential
+
+    def _constants(self, body, h):
+        return body.acc / h**2, 1.5*self.rs
+
+    def advance(self, body, length, nsteps, tracker=None, out=None):
+        """
+        Advance body by orbital angle length (radians) in nsteps RK4 steps.
+        Arguments tracker and out are the same as for physics.advance.
+        """
+
+        u, w, phi, h = self._to_binet(body)
+        k, eps = self._constants(body, h)
+        # integrate in the direction of motion
+        dphi = np.copysign(length / nsteps, h)
+
+        states = np.empty((nsteps if tracker is not None else 0, 3))
+        u, w, phi = _integrate(u, w, phi, dphi, nsteps, k, eps, states)
+
+        if out is None:
+            out = body.copy()
+        out.acc = body.acc
+
+        if tracker is not None:
+            for state in states:
+                out.x[:], out.v[:] = self._to_cartesian(*state, h)
+                tracker.add_point(out)
+
+        out.x[:], out.v[:] = self._to_cartesian(u, w, phi, h)
+        return out
+
+    def perihelia(self, body, norbits, steps_per_orbit=1000):
+        """
+        Return the angles of the first norbits perihelia of body in radians (unwrapped).
+        A perihelion at the initial position is not counted, so the result does not
+        depend on rounding of the initial radial velocity.
+        The integration runs for at most norbits+1 revolutions.
+        """
+
+        u, w, phi, h = self._to_binet(body)
+        k, eps = self._constants(body, h)
+        dphi = np.copysign(2*np.pi / steps_per_orbit, h)
+        angles = np.empty(norbits+1)
+        nfound = _find_perihelia(u, w, phi, dphi, (norbits+1)*steps_per_orbit, k, eps, angles)
+        angles = angles[:nfound]
+        # perihelia are about 2 pi apart, one within half a step is the initial position
+        if nfound and abs(angles[0] - phi) < abs(dphi)/2:
+            angles = angles[1:]
+        return angles[:norbits]
+
+    def precession(self, body, norbits, steps_per_orbit=1000):
+        """
+        Return the average perihelion advance per orbit in radians,
+        positive in the direction of motion.
+        """
+        h = self._to_binet(body)[3]
+        angles = np.copysign(1.0, h) * self.perihelia(body, norbits, steps_per_orbit)
+        return float(np.polyfit(np.arange(len(angles)), angles, 1)[0]) - 2*np.pi
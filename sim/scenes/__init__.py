@@ -0,0 +1,27 @@
+"""
+Complete animations and images that can be run through the command line interface.
+
+Each scene module provides
+ - DEFAULTS: dict with the default configuration,
+ - add_arguments(parser): add scene specific command line arguments,
+ - run(config): produce the scene for a given configuration.
+
+Scene modules are only imported when needed, see load.
+"""
+
+import importlib
+
+## Map command names to scene modules and a short description.
+SCENES = {
+    "anim": ("mercury", "Animate the orbit of Mercury, first Newtonian, then with GR."),
+    "snapshot": ("snapshot", "Draw a snapshot of Mercury's orbit with GR."),
+    "background": ("background", "Draw a simple image that can be used as a background."),
+    "simulate": ("simulate", "Integrate Mercury's orbit without rendering anything."),
+    "sweep": ("sweep", "Run a parallel sweep over alpha, beta, nsteps, and length."),
+    "tune": ("tune", "Find the cheapest number of steps for a precession tolerance."),
+}
+
+
+def load(command):
+    """Import and return the scene module for a command."""
+    return importlib.import_module(f".{SCENES[command][0]}", __name__)
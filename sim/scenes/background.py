@@ -0,0 +1,140 @@
+"""
+Draw a simple image that can be used as a background.
+
+Shows the Sun, Mercury, a short trajectory and gridlines for some large GR effects.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+from .. import geometry, physics, graphics, decimate, util, tikz, svg
+from ..fileio import png_targets
+
+DEFAULTS = {
+    # image dimensions
+    "screen_width": 16,
+    "screen_height": 16,
+    "world_width": 16,
+    "world_height": 16,
+    # number of grid lines in each direction
+    "nlines": 14,
+    # Schwarzschild radius for warping the grid
+    "grid_rs": 0.02,
+    # integrator, length=None selects the length based on Mercury's orbit
+    "ncalls": 153*3,
+    "nsteps": 10,
+    "length": None,
+    "alpha": 5e6,
+    "beta": 0.0,
+    # maximum deviation of the drawn trajectory from the simulated one, in screen units
+    "tolerance": 0.005,
+    # output files, source can be None
+    "output": "background.pdf",
+    "source": "background.tex",
+    # run pdflatex, otherwise only write the source
+    "compile": True,
+    # sizes [width, height] of PNGs rasterized from the PDF, written as <output>-WxH.png
+    "png_sizes": [],
+}
+
+BACKGROUND_COLOUR = "aiphidarkachrom!50!black"
+GRID_COLOUR = "white!45!aiphidarkachrom"
+TRAJECTORY_COLOUR = "white!30!aiphidarkachrom"
+MERCURY_COLOUR = "aiphired!45!aiphidarkachrom"
+SUN_COLOUR = "aiphiyellow!35!aiphidarkachrom"
+
+
+def add_arguments(parser):
+    parser.add_argument("--ncalls", type=int, help="Number of trajectory points")
+    parser.add_argument("--nsteps", type=int,
+                        help="Number of integration steps between trajectory points")
+    parser.add_argument("--length", type=float, help="Trajectory length between points")
+    parser.add_argument("--alpha", type=float, help="GR 1/r coefficient")
+    parser.add_argument("--beta", type=float, help="GR 1/r^2 coefficient")
+    parser.add_argument("--tolerance", type=float,
+                        help="Maximum deviation of the drawn trajectory in screen units")
+    parser.add_argument("-o", "--output",
+                        help="Output file, an SVG is written directly if it ends in .svg")
+    parser.add_argument("--source", help="Write the TeX source to this file")
+    parser.add_argument("--png", dest="png_sizes", type=util.parse_sizes,
+                        help="Also write PNGs of these sizes, e.g. 256x256,1920x1920")
+    parser.add_argument("--no-compile", dest="compile", action="store_false",
+                        help="Do not run pdflatex, only write the TeX source")
+
+def draw_grid(img, lines, centre, rs, config):
+    # maxiumum radius at which a line is shown
+    max_radius = (config["screen_width"]+config["screen_height"])/2 / 3.3
+    ref_point = np.array((config["world_width"], config["world_height"]))
+
+    for line in lines:
+        line = geometry.flamm_projection(line, centre, rs, ref_point)
+        for start, end in util.neighbours(line):
+            radius = np.linalg.norm((start+end)/2 - centre)
+            # fraction of GRID_COLOUR to use for this segment
+            frac = 100 - min(radius / max_radius, 1) * 100
+            img.line([start, end], draw=f'{GRID_COLOUR}!{frac}!{BACKGROUND_COLOUR}', lw=1)
+
+def draw_trajectory(img, trajectory, tolerance):
+    T = len(trajectory)
+    # only draw as many segments as can be resolved in the image
+    indices = decimate.simplify(trajectory, tolerance, img.transform)
+    for start, end in util.neighbours(indices):
+        img.line([trajectory[start], trajectory[end]],
+                 draw=f"{TRAJECTORY_COLOUR}!{start/T*100}!darkachrom", lw=4)
+
+def evolve(mercury, nsteps, params):
+    trajectory = [mercury.x]
+
+    for _ in range(nsteps):
+        mercury = physics.advance(mercury, **params)
+        trajectory.append(mercury.x)
+
+    return mercury, trajectory
+
+def is_svg(config):
+    """Return True if the output is an SVG file which is written without TeX."""
+    return config["output"] is not None and str(config["output"]).endswith(".svg")
+
+def run(config):
+    if config["png_sizes"] and (is_svg(config) or not config["compile"]):
+        raise ValueError("PNGs are rasterized from the PDF, which requires compiling with TeX")
+
+    width, height = config["world_width"], config["world_height"]
+    transform = graphics.Transform((-width/2, -height/2),
+                                   (width/2, height/2),
+                                   (0, 0),
+                                   (config["screen_width"], config["screen_height"]))
+    if is_svg(config):
+        # screen units are cm and line widths are in pt like in Tikz
+        img = svg.Svg(transform, config["output"], flip=True, unit="cm")
+    else:
+        img = tikz.Tikz(transform)
+    lines = geometry.make_grid((-width/2, -height/2), (width/2, height/2),
+                               nlines=(config["nlines"],)*2, resolution=(50, 50))
+
+    mercury = physics.CBody.mercury()
+    sun = physics.CBody.sun()
+
+    length = config["length"]
+    if length is None:
+        length = 2.0 * np.linalg.norm(mercury.v) / mercury.acc / 6
+    integrator_params = {"length": length,
+                         "nsteps": config["nsteps"],
+                         "alpha": config["alpha"],
+                         "beta": config["beta"]}
+    mercury, trajectory = evolve(mercury, config["ncalls"], integrator_params)
+
+    draw_grid(img, chain(*lines), np.array((0, 0)), config["grid_rs"], config)
+    draw_trajectory(img, trajectory, config["tolerance"])
+    img.circle(sun.x, 1, fill=SUN_COLOUR)
+    img.circle(mercury.x, 0.4, fill=MERCURY_COLOUR)
+
+    if is_svg(config):
+        img.close()
+    elif config["compile"]:
+        tikz.render(img, config["output"], config["source"],
+                    rasters=png_targets(config["output"], config["png_sizes"]),
+                    processes=config["processes"])
+    elif config["source"]:
+        tikz.write(img, config["source"])
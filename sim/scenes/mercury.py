@@ -0,0 +1,427 @@
+"""
+Animate the orbit of Mercury, first Newtonian, then warp space and switch on GR.
+"""
+
+import itertools
+import time
+
+import numpy as np
+
+from .. import geometry, physics, graphics, events as ev, profiling, streaming, util
+from ..timeline import Timeline
+from ..fileio import FrameManager
+
+DEFAULTS = {
+    # image dimensions
+    "screen_width": 600,
+    "screen_height": 600,
+    "world_width": 16,
+    "world_height": 16,
+    # size of output pixel images
+    "output_width": 1024,
+    "output_height": 1024,
+    # additional sizes [width, height] of PNG frames, rasterized together with the
+    # main size and written to subdirectories WIDTHxHEIGHT of the frames directory
+    "extra_sizes": [],
+    # "tk", "svg" (write SVG frames), or "null" (draw nothing)
+    "backend": "tk",
+    "headless": False,
+    # sleep to play the animation at fps, otherwise run as fast as possible
+    "realtime": True,
+    "fps": 60,
+    # keep the window open after the animation has finished
+    "mainloop": True,
+    # directory to store frames in, None to not store frames
+    "frames": "frames",
+    "gif": None,
+    "mp4": "mercury.mp4",
+    # integrator, length=None selects the length based on Mercury's orbit
+    "nsteps": 40,
+    "length": None,
+    # simulated time per second of playback, None to advance by length every frame
+    # otherwise frames are interpolated between states that are length apart
+    "speed": None,
+    "alpha": 0.0,
+    "beta": 2e6,
+    # number of perihelia to show in Newtonian mode
+    "newtonian_perihelia": 4,
+    # number of frames to show in GR mode
+    "gr_frames": 600,
+    # Schwarzschild radius for warping the grid
+    "grid_rs": 0.017,
+    "profile": False,
+    "trace_file": None,
+    # simulate in a worker thread, the main thread only draws
+    "worker": False,
+    # maximum number of frames the worker computes ahead
+    "queue_size": 8,
+}
+
+GRID_COLOUR = "#404040"
+BACKGROUND_COLOUR = "#161616"
+TRAJECTORY_COLOUR = "#606060"
+PERIHELION_COLOUR = "#a0a0a0"
+MERCURY_COLOUR = "red"
+SUN_COLOUR = "yellow"
+
+
+def add_arguments(parser):
+    parser.add_argument("--backend", choices=("tk", "svg", "null"),
+                        help="Backend to draw with, 'svg' writes every frame as SVG to "
+                        "the frames directory, 'null' draws nothing")
+    parser.add_argument("--headless", action="store_true",
+                        help="Do not open a window, implies --backend null --no-realtime "
+                        "--no-mainloop --no-frames")
+    parser.add_argument("--no-realtime", dest="realtime", action="store_false",
+                        help="Do not sleep between frames")
+    parser.add_argument("--fps", type=int, help="Frames per second")
+    parser.add_argument("--no-mainloop", dest="mainloop", action="store_false",
+                        help="Exit when the animation has finished")
+    parser.add_argument("--frames", help="Directory to store frames in")
+    parser.add_argument("--no-frames", dest="frames", action="store_const", const=None,
+                        help="Do not store frames")
+    parser.add_argument("--extra-sizes", type=util.parse_sizes,
+                        help="Also write PNG frames of these sizes, e.g. 256x256,3840x3840")
+    parser.add_argument("--gif", help="Write a GIF to this file")
+    parser.add_argument("--mp4", help="Write an MP4 to this file")
+    parser.add_argument("--no-mp4", dest="mp4", action="store_const", const=None,
+                        help="Do not write an MP4")
+    parser.add_argument("--nsteps", type=int, help="Number of integration steps per frame")
+    parser.add_argument("--length", type=float, help="Trajectory length per frame")
+    parser.add_argument("--speed", type=float,
+                        help="Simulated time per second, decouples frames from steps")
+    parser.add_argument("--alpha", type=float, help="GR 1/r coefficient")
+    parser.add_argument("--beta", type=float, help="GR 1/r^2 coefficient")
+    parser.add_argument("--gr-frames", type=int, help="Number of frames with GR")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print timings of all phases of the animation")
+    parser.add_argument("--trace-file", help="Write a Chrome trace to this file")
+    parser.add_argument("--worker", action="store_true",
+                        help="Simulate in a worker thread and skip frames if drawing "
+                        "falls behind")
+    parser.add_argument("--queue-size", type=int,
+                        help="Maximum number of frames the worker computes ahead")
+
+def _make_grid(config):
+    width, height = config["world_width"], config["world_height"]
+    return geometry.make_grid((-width/2-4, -height/2-4),
+                              (width/2+4, height/2+4),
+                              nlines=(20, 20), resolution=(50, 50))
+
+def _make_backend(config):
+    width, height = config["world_width"], config["world_height"]
+    transform = graphics.Transform((-width/2, -height/2),
+                                   (width/2, height/2),
+                                   (0, 0),
+                                   (config["screen_width"], config["screen_height"]))
+    if config["backend"] == "tk":
+        from .. import tk
+        return tk.Tk(transform, background=BACKGROUND_COLOUR)
+    if config["backend"] == "svg":
+        from .. import svg
+        return svg.SvgFrames(transform, config["frames"], background=BACKGROUND_COLOUR)
+    if config["backend"] == "null":
+        from .. import null
+        return null.Null(transform, background=BACKGROUND_COLOUR)
+    raise ValueError(f"Unknown backend: {config['backend']}")
+
+
+class Simulation:
+    """
+    Produce ready-to-draw frames of the animation.
+
+    Frames are dicts with any of the keys
+     - grid: Array of grid lines in screen coordinates, replaces the previous grid.
+     - trajectory: List of new points of the trajectory, starting at the last drawn point.
+     - mercury: Position of Mercury, None to hide Mercury.
+     - pings: List of positions to mark with a ping.
+    An empty dict is a frame where nothing changes.
+    Frames do not share memory, they can be produced in a worker thread.
+    """
+
+    def __init__(self, transform, config, profiler=profiling.NULL_PROFILER):
+        self.transform = transform
+        self.config = config
+        self.profiler = profiler
+        self.fps = config["fps"]
+        self.speed = config["speed"]
+        self.ref_point = np.array((config["world_width"], config["world_height"]))
+        self.grid_lines = list(itertools.chain(*_make_grid(config)))
+        self.mercury = physics.CBody.mercury()
+        self.sun = physics.CBody.sun()
+
+        length = config["length"]
+        if length is None:
+            length = 2.0 * np.linalg.norm(self.mercury.v) / self.mercury.acc / 2 * 2
+        self.integrator_params = {"length": length,
+                                  "nsteps": config["nsteps"],
+                                  "alpha": 0.0,
+                                  "beta": 0.0}
+        # perihelia found since the last frame
+        self._pings = []
+
+    def _ping(self, point):
+        self._pings.append(point)
+
+    def grid_frame(self, rs):
+        # all lines of a frame are projected into one new array
+        with self.profiler.span("geometry"):
+            grid = np.empty((len(self.grid_lines), *self.grid_lines[0].shape))
+            for line, out in zip(self.grid_lines, grid):
+                self.transform.flamm2screen(line, np.array((0, 0)), rs, self.ref_point,
+                                            out=out)
+        return {"grid": grid}
+
+    def grid(self, rsiter):
+        for rs in rsiter:
+            yield self.grid_frame(rs)
+
+    def orbit(self, iterator, events):
+        if self.speed is not None:
+            timeline = Timeline(self.mercury, self.integrator_params, chunk=1,
+                                events=events)
+            frame_times = (frame * self.speed / self.fps for frame in itertools.count(1))
+
+        for _ in iterator:
+            previous = self.mercury.x
+            with self.profiler.span("physics"):
+                if self.speed is None:
+                    self.mercury = events.advance(self.mercury, **self.integrator_params)
+                    self.profiler.count("steps", self.integrator_params["nsteps"])
+                else:
+                    self.mercury = timeline.body(next(frame_times))
+            pings, self._pings = self._pings, []
+            yield {"trajectory": [previous, self.mercury.x],
+                   "mercury": self.mercury.x,
+                   "pings": pings}
+
+    def sleep(self, duration, first=None):
+        """Yield frames where nothing changes, except for optional changes in first."""
+        for frame in range(int(duration*self.fps)):
+            yield first if frame == 0 and first else {}
+
+    def frames(self):
+        """Generator of all frames of the animation after the initial grid."""
+
+        # newtonian
+        events, iterator = until_perihelion(self.config["newtonian_perihelia"], self.sun.x,
+                                            self._ping)
+        yield from self.orbit(iterator, events)
+
+        # transform grid
+        yield from self.sleep(0.5, first={"mercury": None})
+        yield from self.grid(np.linspace(0, self.config["grid_rs"], self.fps))
+        yield from self.sleep(0.5)
+
+        # switch on GR
+        self.integrator_params["alpha"] = self.config["alpha"]
+        self.integrator_params["beta"] = self.config["beta"]
+        events = ev.Events([ev.periapsis(self.sun.x, callback=self._ping)])
+        yield from self.orbit(range(self.config["gr_frames"]), events)
+
+
+def coalesce(frames):
+    """Merge consecutive frames into one that has the same effect when drawn."""
+
+    merged = {}
+    for frame in frames:
+        for key, value in frame.items():
+            if key == "trajectory" and "trajectory" in merged:
+                merged["trajectory"] = merged["trajectory"] + value[1:]
+            elif key == "pings" and "pings" in merged:
+                merged["pings"] = merged["pings"] + value
+            else:
+                merged[key] = value
+    return merged
+
+
+class Animation:
+    """Draw and pace the frames of the animation."""
+
+    def __init__(self, anim, config, frames=None, profiler=profiling.NULL_PROFILER):
+        self.anim = anim
+        self.frames = frames
+        self.profiler = profiler
+        self.fps = config["fps"]
+        self.realtime = config["realtime"]
+        self.queue_size = config["queue_size"]
+        # convert frames to PNG right away or in parallel after the animation
+        self.png = config["processes"] <= 1
+        self.output_size = (config["output_width"], config["output_height"])
+
+    def draw_grid(self, grid):
+        for line in grid:
+            self.anim.line(line, GRID_COLOUR, tags="grid", screen=True)
+
+    def draw(self, frame):
+        """Apply the changes of a single frame to the canvas."""
+
+        with self.profiler.span("draw"):
+            if "grid" in frame:
+                self.anim.clear("grid")
+                self.draw_grid(frame["grid"])
+                self.anim.lower("grid", "sun")
+            if "trajectory" in frame:
+                self.anim.line(frame["trajectory"], TRAJECTORY_COLOUR, lw=2,
+                               tags="trajectory")
+            if "mercury" in frame:
+                self.anim.clear("mercury")
+                if frame["mercury"] is not None:
+                    self.anim.circle(frame["mercury"], 0.2, fill=MERCURY_COLOUR,
+                                     tags="mercury")
+            for point in frame.get("pings", ()):
+                self.anim.ping(point, PERIHELION_COLOUR)
+
+    def update(self):
+        """Update the display and save the frame."""
+
+        with self.profiler.span("update"):
+            self.anim.update()
+
+        if self.frames:
+            with self.profiler.span("save_frame"):
+                self.frames.save_frame(self.anim.canvas, ps=True, png=self.png,
+                                       size=self.output_size)
+
+    def play(self, frames):
+        """Draw all frames in the calling thread, sleep for the rest of each frame."""
+
+        # compute the next frame within the current one to avoid an empty last frame
+        frames = iter(frames)
+        frame = next(frames, None)
+        while frame is not None:
+            start = time.time()
+            with self.profiler.frame():
+                self.draw(frame)
+                self.update()
+                frame = next(frames, None)
+
+            if self.realtime:
+                end = time.time()
+                time_diff = end-start
+                time.sleep(max(1/self.fps - time_diff, 0))
+
+    def play_threaded(self, frames):
+        """
+        Produce frames in a worker thread and only draw them in the calling thread.
+
+        When drawing falls behind, all frames that are due are coalesced and
+        drawn at once. Saved frames are never coalesced.
+        """
+
+        with streaming.Producer(frames, self.queue_size) as producer:
+            deadline = time.time()
+            while True:
+                if self.frames:
+                    due = 1
+                elif self.realtime:
+                    behind = int((time.time() - deadline) * self.fps)
+                    due = 1 + min(max(behind, 0), self.queue_size)
+                else:
+                    due = self.queue_size
+                batch = producer.get(due)
+                if not batch:
+                    break
+
+                with self.profiler.frame():
+                    self.profiler.count("coalesced", len(batch) - 1)
+                    self.draw(coalesce(batch))
+                    self.update()
+
+                if self.realtime:
+                    deadline = max(deadline + len(batch) / self.fps,
+                                   time.time() - self.queue_size / self.fps)
+                    time.sleep(max(deadline - time.time(), 0))
+
+
+def until_perihelion(niterations, reference_point, pinger):
+    """
+    Construct events and an animation iterator to animate until
+    niterations perihelions have been visited, counting the initial position.
+    The events mark all perihelions but cheat and place all pings at the position
+    of the first one by calling pinger. This is to hide numerical inaccuracies in
+    finding the perihelions.
+    """
+
+    def _on_perihelion(point):
+        # occurrences are rows of t, x, y, vx, vy
+        pinger(events.occurrences(perihelion)[0, 1:3])
+
+    perihelion = ev.periapsis(reference_point, callback=_on_perihelion)
+    events = ev.Events([perihelion])
+
+    def _iterator():
+        while perihelion.count < niterations - 1:
+            yield perihelion.count
+
+    return events, _iterator()
+
+def write_animation(frames, size, gif=None, mp4=None, fps=60, processes=1):
+    print(f"Linked {frames.nduplicates()} duplicate frames")
+    if processes > 1:
+        print("Converting frames")
+        frames.convert_all(size, processes)
+
+    if gif:
+        print("Finishing GIF")
+        frames.finish_gif()
+        print(f"Created animation {gif}")
+
+    if mp4:
+        print("Creating MP4")
+        frames.convert_to_mp4(mp4, fps=fps)
+        print(f"Created animation {mp4}")
+
+
+def run(config):
+    if config["headless"]:
+        config = {**config, "backend": "null", "realtime": False, "mainloop": False,
+                  "frames": None}
+    if config["backend"] == "svg":
+        if not config["frames"]:
+            raise ValueError("The svg backend requires a frames directory")
+        # frames are written by the backend
+        config = {**config, "realtime": False, "mainloop": False}
+    elif config["frames"] and config["backend"] != "tk":
+        raise ValueError("Saving frames requires the tk or svg backend")
+    if config["extra_sizes"] and not (config["frames"] and config["backend"] == "tk"):
+        raise ValueError("Extra frame sizes require saving frames with the tk backend")
+
+    anim = _make_backend(config)
+    frames = None
+    if config["frames"] and config["backend"] == "tk":
+        frames = FrameManager(config["frames"], True, extra_sizes=config["extra_sizes"])
+        if config["gif"]:
+            # encode the GIF while the animation is running
+            frames.stream_gif(config["gif"], (config["output_width"], config["output_height"]),
+                              fps=config["fps"])
+    profiler = profiling.Profiler(frame_budget=1/config["fps"],
+                                  trace=config["trace_file"] is not None) \
+        if config["profile"] or config["trace_file"] else profiling.NULL_PROFILER
+    animation = Animation(anim, config, frames, profiler)
+    simulation = Simulation(anim.transform, config, profiler)
+
+    anim.draw_background()
+    animation.draw_grid(simulation.grid_frame(0)["grid"])
+    anim.circle(simulation.sun.x, 0.8, fill=SUN_COLOUR, tags="sun")
+
+    if config["worker"]:
+        animation.play_threaded(simulation.frames())
+    else:
+        animation.play(simulation.frames())
+
+    if config["backend"] == "svg":
+        print(f"Wrote SVG frames to {config['frames']}")
+
+    if profiler:
+        print(profiler.format_summary())
+        if config["trace_file"]:
+            profiler.write_chrome_trace(config["trace_file"])
+
+    if frames:
+        write_animation(frames, animation.output_size, config["gif"], config["mp4"],
+                        config["fps"], config["processes"])
+
+    if config["mainloop"] and config["backend"] == "tk":
+        from .. import tk
+        tk.mainloop()
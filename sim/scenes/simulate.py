@@ -0,0 +1,107 @@
+"""
+Integrate Mercury's orbit without rendering anything.
+
+Writes the final state and all found perihelia and aphelia as JSON.
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from .. import physics, streaming, tracker as trk
+
+DEFAULTS = {
+    # integrator, length=None selects the length based on Mercury's orbit
+    "ncalls": 1000,
+    "nsteps": 10,
+    "length": None,
+    "alpha": 0.0,
+    "beta": 2e6,
+    # include the other planets
+    "nbody": False,
+    # output file, None or '-' for stdout
+    "output": None,
+    # file to stream the full trajectory to (raw float64, see streaming.load_chunks)
+    "trajectory": None,
+}
+
+
+def add_arguments(parser):
+    parser.add_argument("--ncalls", type=int, help="Number of calls to advance")
+    parser.add_argument("--nsteps", type=int, help="Number of integration steps per call")
+    parser.add_argument("--length", type=float, help="Trajectory length per call")
+    parser.add_argument("--alpha", type=float, help="GR 1/r coefficient")
+    parser.add_argument("--beta", type=float, help="GR 1/r^2 coefficient")
+    parser.add_argument("--nbody", action="store_true",
+                        help="Include perturbations by the other planets")
+    parser.add_argument("-o", "--output", help="Write results to this file")
+    parser.add_argument("--trajectory",
+                        help="Stream all states to this file (not with --nbody)")
+
+def run(config):
+    mercury = physics.CBody.mercury()
+    sun = physics.CBody.sun()
+
+    perihelia = []
+    aphelia = []
+    tracker = trk.ExtremaTracker(sun.x, on_periapsis=lambda point: perihelia.append(point),
+                                 on_apapsis=lambda point: aphelia.append(point))
+
+    length = config["length"]
+    if length is None:
+        length = 2.0 * np.linalg.norm(mercury.v) / mercury.acc / 2
+    integrator_params = {"length": length,
+                         "nsteps": config["nsteps"],
+                         "alpha": config["alpha"],
+                         "beta": config["beta"]}
+
+    start = time.perf_counter()
+    if config["nbody"]:
+        if config["trajectory"]:
+            raise ValueError("Cannot write a trajectory in N-body mode")
+        from .. import nbody  # requires numba
+
+        # positions are relative to the Sun
+        tracker.reference_point = np.zeros(2)
+        system = nbody.NBody.solar_system()
+        for _ in range(config["ncalls"]):
+            system = nbody.advance_nbody(system, **integrator_params, tracker=tracker)
+        mercury = system.body("mercury")
+    else:
+        last = None
+        def _keep_last(chunk):
+            nonlocal last
+            last = chunk[-1]
+
+        consumers = [_keep_last]
+        writer = None
+        if config["trajectory"]:
+            writer = streaming.ChunkWriter(config["trajectory"])
+            consumers.append(writer)
+        try:
+            streaming.feed(streaming.stream(mercury, integrator_params,
+                                            ncalls=config["ncalls"], tracker=tracker),
+                           *consumers)
+        finally:
+            if writer:
+                writer.close()
+        if last is not None:
+            mercury = physics.CBody(last[:2].copy(), last[2:].copy(), mercury.acc)
+    elapsed = time.perf_counter() - start
+
+    results = {"params": integrator_params,
+               "ncalls": config["ncalls"],
+               "x": mercury.x.tolist(),
+               "v": mercury.v.tolist(),
+               "perihelia": np.array(perihelia).tolist(),
+               "aphelia": np.array(aphelia).tolist(),
+               "seconds": elapsed}
+
+    if config["output"] in (None, "-"):
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(config["output"], "w") as outf:
+            json.dump(results, outf, indent=2)
@@ -0,0 +1,219 @@
+"""
+Draw a snapshot of Mercury's orbit with GR including marked perihelia.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+from .. import geometry, physics, graphics, decimate, tracker as trk, util, tikz, svg, sweep
+from ..fileio import ResultStore, png_targets
+
+DEFAULTS = {
+    # image dimensions
+    "screen_width": 16,
+    "screen_height": 16,
+    "world_width": 16,
+    "world_height": 16,
+    # number of grid lines in each direction
+    "nlines": 16,
+    # Schwarzschild radius for warping the grid
+    "grid_rs": 0.017,
+    # integrator, length=None selects the length based on Mercury's orbit
+    "ncalls": 1000,
+    "nsteps": 10,
+    "length": None,
+    "alpha": 0.0,
+    "beta": 2e6,
+    # maximum deviation of the drawn trajectory from the simulated one, in screen units
+    "tolerance": 0.005,
+    # output files, source and image can be None
+    "output": "snapshot.pdf",
+    "source": "snapshot.tex",
+    "image": "image.tex",
+    # run pdflatex, otherwise only write source and image
+    "compile": True,
+    # sizes [width, height] of PNGs rasterized from the PDF, written as <output>-WxH.png
+    "png_sizes": [],
+    # directory of a fileio.ResultStore to reuse simulations from, None to always simulate
+    "store": None,
+}
+
+BACKGROUND_COLOUR = "aiphidarkachrom!50!black"
+GRID_COLOUR = "white!50!aiphidarkachrom"
+TRAJECTORY_COLOUR = "white!40!aiphidarkachrom"
+PERIHELION_COLOUR = "white!80!aiphidarkachrom"
+MERCURY_COLOUR = "aiphired!60!aiphidarkachrom"
+SUN_COLOUR = "aiphiyellow!80!aiphidarkachrom"
+
+# Define shading to make the sun glow.
+# This must be included in the preamble of any TeX document
+# using images created with this script!
+EXTRA_PREAMBLE = r"""\pgfdeclareradialshading{glow}{\pgfpoint{0cm}{0cm}}{
+  color(0mm)=(white);
+  color(1.7mm)=(white);
+  color(2mm)=(white!50!black);
+  color(2.4mm)=(white!20!transparent);
+  color(2.7mm)=(transparent)
+}
+
+\begin{tikzfadingfrompicture}[name=glow fading]
+  \shade[shading=glow] (0,0) circle (1.3);
+\end{tikzfadingfrompicture}
+"""
+
+# The same glow as a radial gradient for SVG output.
+SVG_GLOW = """<defs><radialGradient id="glow">
+  <stop offset="0.63" stop-color="{colour}"/>
+  <stop offset="0.74" stop-color="{colour}" stop-opacity="0.5"/>
+  <stop offset="0.89" stop-color="{colour}" stop-opacity="0.2"/>
+  <stop offset="1" stop-color="{colour}" stop-opacity="0"/>
+</radialGradient></defs>"""
+
+
+def add_arguments(parser):
+    parser.add_argument("--ncalls", type=int, help="Number of trajectory points")
+    parser.add_argument("--nsteps", type=int,
+                        help="Number of integration steps between trajectory points")
+    parser.add_argument("--length", type=float, help="Trajectory length between points")
+    parser.add_argument("--alpha", type=float, help="GR 1/r coefficient")
+    parser.add_argument("--beta", type=float, help="GR 1/r^2 coefficient")
+    parser.add_argument("--tolerance", type=float,
+                        help="Maximum deviation of the drawn trajectory in screen units")
+    parser.add_argument("-o", "--output",
+                        help="Output file, an SVG is written directly if it ends in .svg")
+    parser.add_argument("--source", help="Write the TeX source to this file")
+    parser.add_argument("--image", help="Write the bare tikzpicture to this file")
+    parser.add_argument("--png", dest="png_sizes", type=util.parse_sizes,
+                        help="Also write PNGs of these sizes, e.g. 256x256,1920x1920")
+    parser.add_argument("--no-compile", dest="compile", action="store_false",
+                        help="Do not run pdflatex, only write the TeX source")
+    parser.add_argument("--store",
+                        help="Results store directory, simulations already in it are reused")
+
+def draw_grid(img, lines, centre, rs, config):
+    # maximum radius at which a line is shown
+    max_radius = (config["screen_width"]+config["screen_height"])/2 / 3
+    ref_point = np.array((config["world_width"], config["world_height"]))
+
+    for line in lines:
+        line = geometry.flamm_projection(line, centre, rs, ref_point)
+        for start, end in util.neighbours(line):
+            radius = np.linalg.norm((start+end)/2 - centre)
+            # fraction of GRID_COLOUR to use for this segment
+            frac = 100 - min(radius / max_radius, 1) * 100
+            img.line([start, end], draw=f'{GRID_COLOUR}!{frac}!{BACKGROUND_COLOUR}', lw=1)
+
+def draw_trajectory(img, trajectory, tolerance):
+    T = len(trajectory)
+    # only draw as many segments as can be resolved in the image
+    indices = decimate.simplify(trajectory, tolerance, img.transform)
+    for start, end in util.neighbours(indices):
+        img.line([trajectory[start], trajectory[end]],
+                 draw=f"{TRAJECTORY_COLOUR}!{start/T*100}!darkachrom", lw=2)
+
+def scale_to(x, from_max, to_min, to_max):
+    """Scale a value from range [0, from_max] to range [to_min, to_max]."""
+    return x / from_max * (to_max - to_min) + to_min
+
+def draw_perihelions(img, perihelions):
+    nper = len(perihelions)
+    for i, perihelion in enumerate(perihelions):
+        if nper == 1:
+            col = 100
+        else:
+            col = scale_to(i, nper-1, 50, 100)
+        colour = f"{PERIHELION_COLOUR}!{col}!aiphidarkachrom"
+        img.circle(perihelion, 0.2, fill=colour)
+
+def evolve(mercury, nsteps, params, tracker):
+    trajectory = [mercury.x]
+
+    for _ in range(nsteps):
+        mercury = physics.advance(mercury, **params, tracker=tracker)
+        trajectory.append(mercury.x)
+
+    return mercury, np.array(trajectory)
+
+def simulate(params):
+    """
+    Integrate Mercury's orbit for params (integrator parameters plus ncalls).
+    Returns metrics and arrays as expected by fileio.ResultStore.
+    """
+
+    perihelions = []
+    tracker = trk.ExtremaTracker(physics.CBody.sun().x, on_periapsis=perihelions.append)
+    integrator_params = {name: params[name] for name in ("length", "nsteps", "alpha", "beta")}
+    mercury, trajectory = evolve(physics.CBody.mercury(), params["ncalls"], integrator_params,
+                                 tracker)
+    return ({"x": mercury.x.tolist(),
+             "v": mercury.v.tolist(),
+             "nperihelia": len(perihelions),
+             "precession": sweep.precession(perihelions)},
+            {"trajectory": trajectory,
+             "perihelia": np.array(perihelions).reshape(len(perihelions), 2)})
+
+def is_svg(config):
+    """Return True if the output is an SVG file which is written without TeX."""
+    return config["output"] is not None and str(config["output"]).endswith(".svg")
+
+def run(config):
+    if config["png_sizes"] and (is_svg(config) or not config["compile"]):
+        raise ValueError("PNGs are rasterized from the PDF, which requires compiling with TeX")
+
+    width, height = config["world_width"], config["world_height"]
+    transform = graphics.Transform((-width/2, -height/2),
+                                   (width/2, height/2),
+                                   (0, 0),
+                                   (config["screen_width"], config["screen_height"]))
+    if is_svg(config):
+        # screen units are cm and line widths are in pt like in Tikz
+        img = svg.Svg(transform, config["output"], flip=True, unit="cm")
+    else:
+        img = tikz.Tikz(transform)
+    lines = geometry.make_grid((-width/2, -height/2), (width/2, height/2),
+                               nlines=(config["nlines"],)*2, resolution=(50, 50))
+
+    sun = physics.CBody.sun()
+
+    length = config["length"]
+    if length is None:
+        length = float(sweep.default_length(physics.CBody.mercury()))
+    params = {"length": length,
+              "nsteps": config["nsteps"],
+              "alpha": config["alpha"],
+              "beta": config["beta"],
+              "ncalls": config["ncalls"]}
+
+    if config["store"]:
+        with ResultStore(config["store"]) as store:
+            record = store.compute(params, simulate)
+            metrics = record["metrics"]
+            arrays = {name: store.load(record, name, mmap=False) for name in record["arrays"]}
+    else:
+        metrics, arrays = simulate(params)
+    trajectory = arrays["trajectory"]
+    perihelions = list(arrays["perihelia"])
+    mercury_x = np.array(metrics["x"])
+
+    draw_grid(img, chain(*lines), np.array((0, 0)), config["grid_rs"], config)
+    draw_trajectory(img, trajectory, config["tolerance"])
+    draw_perihelions(img, perihelions)
+    if is_svg(config):
+        img.cmd(SVG_GLOW.format(colour=svg.svg_colour(SUN_COLOUR)))
+        img.circle(sun.x, 1.3, fill="url(#glow)", draw="none")
+    else:
+        img.cmd(rf"\fill[{SUN_COLOUR},path fading=glow fading] {tikz.fmt_point(sun.x)} circle (3);")
+    img.circle(mercury_x, 0.4, fill=MERCURY_COLOUR)
+
+    if is_svg(config):
+        img.close()
+    elif config["compile"]:
+        tikz.render(img, config["output"], config["source"], extra_preamble=EXTRA_PREAMBLE,
+                    rasters=png_targets(config["output"], config["png_sizes"]),
+                    processes=config["processes"])
+    elif config["source"]:
+        tikz.write(img, config["source"], extra_preamble=EXTRA_PREAMBLE)
+    if config["image"] and not is_svg(config):
+        with open(config["image"], "w") as f:
+            f.write(str(img))
@@ -0,0 +1,61 @@
+"""
+Run a parallel sweep over alpha, beta, nsteps, and length.
+
+Writes one JSON object per completed point to the output file and skips
+points already in that file so an interrupted sweep can be resumed.
+"""
+
+import numpy as np
+
+from .. import sweep
+
+DEFAULTS = {
+    # lists of parameter values, all combinations are run
+    # a length of None selects the length based on Mercury's orbit
+    "alpha": [0.0],
+    "beta": [0.0, 5e5, 1e6, 2e6],
+    "nsteps": [10],
+    "length": [None],
+    # number of calls to advance per point
+    "ncalls": 1000,
+    # number of points sent to a worker process at once
+    "chunksize": 1,
+    "output": "sweep.jsonl",
+    # use all cores by default
+    "processes": None,
+}
+
+
+def _values(string):
+    """Parse a list of numbers, either comma separated or as start:stop:num."""
+    if ":" in string:
+        start, stop, num = string.split(":")
+        return np.linspace(float(start), float(stop), int(num)).tolist()
+    return [float(val) for val in string.split(",")]
+
+def add_arguments(parser):
+    parser.add_argument("--alpha", type=_values,
+                        help="GR 1/r coefficients, 'a,b,c' or 'start:stop:num'")
+    parser.add_argument("--beta", type=_values,
+                        help="GR 1/r^2 coefficients, 'a,b,c' or 'start:stop:num'")
+    parser.add_argument("--nsteps", type=lambda string: [int(val) for val in string.split(",")],
+                        help="Numbers of steps per call, 'a,b,c'")
+    parser.add_argument("--length", type=_values, help="Lengths per call")
+    parser.add_argument("--ncalls", type=int, help="Number of calls to advance per point")
+    parser.add_argument("--chunksize", type=int,
+                        help="Number of points sent to a worker at once")
+    parser.add_argument("-o", "--output", help="Results file (JSON Lines)")
+
+def run(config):
+    points = sweep.sweep_points(config["alpha"], config["beta"],
+                                config["nsteps"], config["length"])
+
+    def _progress(ndone, ntotal):
+        print(f"\r{ndone}/{ntotal}", end="", flush=True)
+
+    ncomputed = sweep.run_sweep(points, config["output"], config["ncalls"],
+                                processes=config["processes"],
+                                chunksize=config["chunksize"],
+                                progress=_progress)
+    print(f"\nComputed {ncomputed} of {len(points)} points, "
+          f"results in {config['output']}")
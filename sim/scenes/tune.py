@@ -0,0 +1,55 @@
+"""
+Find the cheapest number of integration steps for a precession tolerance.
+
+Prints the calibration runs and the chosen integrator parameters, optionally
+writes them as JSON that can be passed to other commands via --config.
+"""
+
+import json
+
+from .. import physics, tuning
+
+DEFAULTS = {
+    # maximum error of the perihelion precession per orbit in radians
+    "tolerance": 1e-4,
+    # length=None selects the length based on Mercury's orbit
+    "length": None,
+    "alpha": 0.0,
+    "beta": 2e6,
+    # number of orbits per calibration run
+    "norbits": 3,
+    "max_nsteps": 4096,
+    # file to write the chosen parameters to
+    "output": None,
+}
+
+
+def add_arguments(parser):
+    parser.add_argument("-t", "--tolerance", type=float,
+                        help="Maximum precession error per orbit in radians")
+    parser.add_argument("--length", type=float, help="Trajectory length per call")
+    parser.add_argument("--alpha", type=float, help="GR 1/r coefficient")
+    parser.add_argument("--beta", type=float, help="GR 1/r^2 coefficient")
+    parser.add_argument("--norbits", type=int, help="Number of orbits per calibration run")
+    parser.add_argument("--max-nsteps", type=int, help="Largest number of steps to try")
+    parser.add_argument("-o", "--output", help="Write the chosen parameters as JSON")
+
+def run(config):
+    params, report = tuning.tune(config["tolerance"], physics.CBody.mercury(),
+                                 length=config["length"], alpha=config["alpha"],
+                                 beta=config["beta"], norbits=config["norbits"],
+                                 max_nsteps=config["max_nsteps"])
+
+    print(f"{'nsteps':>8} {'precession':>12} {'energy drift':>12} {'L drift':>9}")
+    for level in report["levels"]:
+        print(f"{level['nsteps']:>8} {level['precession']:>12.8f} "
+              f"{level['energy_drift']:>12.2e} {level['momentum_drift']:>9.1e}")
+
+    print(f"\nnsteps={params['nsteps']} per length={params['length']:.6g}: "
+          f"estimated error {report['error']:.2e} rad per orbit (order {report['order']:.2f}), "
+          f"{report['steps_per_orbit']:.0f} steps and "
+          f"{report['seconds_per_orbit']*1e3:.3g} ms per orbit")
+
+    if config["output"]:
+        with open(config["output"], "w") as outf:
+            json.dump(params, outf, indent=2)
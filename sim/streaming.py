@@ -0,0 +1,246 @@
+"""
+Stream simulation states in fixed-size chunks.
+
+stream() is a generator that produces arrays of states one chunk at a time, so
+arbitrarily long runs use constant memory. Chunks are only computed when a
+consumer asks for the next one, i.e. consumers naturally apply backpressure.
+feed() passes every chunk to several consumers, e.g. a tracker, a file writer,
+and a renderer. threaded() and Producer decouple producer and consumers through a
+bounded queue.
+"""
+
+from pathlib import Path
+import queue
+import threading
+
+import numpy as np
+
+from .physics import _integrate
+
+## Number of columns of a state chunk: x, y, vx, vy.
+STATE_SIZE = 4
+
+
+class StopStream(Exception):
+    """Raise in a consumer to stop feed()."""
+
+
+def stream(body, params, chunk=1024, ncalls=None, tracker=None, events=None):
+    """
+    Generator that yields states of body in chunks.
+
+    Each row of a chunk is the state (x, y, vx, vy) after advancing by
+    params["length"] in params["nsteps"] steps, i.e. the same as one call to
+    physics.advance(body, **params).
+
+    Arguments:
+        body: Initial CBody, is not modified.
+        params: dict with keys length, nsteps, alpha, beta.
+        chunk: Number of states per chunk.
+        ncalls: Total number of states to produce, None to run forever.
+                The last chunk is shorter if ncalls is not a multiple of chunk.
+        tracker: Fed with the body after every integration step.
+        events: events.Events to detect during integration, used instead of the tracker.
+                If a terminal event fires, the stream ends with the state at the event.
+    """
+
+    body = body.copy()
+    dt = params["length"] / params["nsteps"]
+
+    remaining = ncalls
+    while remaining is None or remaining > 0:
+        size = chunk if remaining is None else min(chunk, remaining)
+        out = np.empty((size, STATE_SIZE))
+        for index, row in enumerate(out):
+            if events is None:
+                _integrate(body, dt, params["nsteps"], params["alpha"], params["beta"], tracker)
+            else:
+                events.integrate(body, dt, params["nsteps"], params["alpha"], params["beta"])
+            row[:2] = body.x
+            row[2:] = body.v
+            if events is not None and events.terminated:
+                yield out[:index+1]
+                return
+        if remaining is not None:
+            remaining -= size
+        yield out
+
+def positions(chunk):
+    """Return view of the positions in a chunk."""
+    return chunk[:, :2]
+
+def velocities(chunk):
+    """Return view of the velocities in a chunk."""
+    return chunk[:, 2:]
+
+def feed(chunks, *consumers):
+    """
+    Pass every chunk to all consumers in order.
+
+    Consumers are functions taking a chunk. The next chunk is only produced
+    once all consumers have returned. Any consumer can raise StopStream to
+    end the stream.
+
+    Returns:
+        Number of chunks that were fed.
+    """
+
+    nchunks = 0
+    try:
+        for chunk in chunks:
+            nchunks += 1
+            for consumer in consumers:
+                consumer(chunk)
+    except StopStream:
+        pass
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    return nchunks
+
+def track(tracker):
+    """Return a consumer that feeds all positions of a chunk to a tracker."""
+    def _consume(chunk):
+        for point in positions(chunk):
+            tracker.add_point(point)
+    return _consume
+
+def limit(nchunks):
+    """Return a consumer that stops the stream after nchunks chunks."""
+    count = 0
+    def _consume(chunk):
+        nonlocal count
+        count += 1
+        if count >= nchunks:
+            raise StopStream()
+    return _consume
+
+class Producer:
+    """
+    Run an iterator in a background thread and buffer its items in a bounded queue.
+
+    The producer blocks when maxsize items are buffered.
+    Exceptions raised by the iterator are re-raised by get.
+    Use as a context manager or call close to stop the thread.
+    """
+
+    _done = object()
+
+    def __init__(self, items, maxsize=4):
+        self._buffer = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._produce, args=(items,), daemon=True)
+        self._thread.start()
+
+    def _produce(self, items):
+        try:
+            for item in items:
+                while not self._stop.is_set():
+                    try:
+                        self._buffer.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if self._stop.is_set():
+                    break
+        except Exception as exc:  # forward to the consumer
+            self._buffer.put(exc)
+        finally:
+            self._buffer.put(self._done)
+
+    def _unpack(self, item):
+        if item is self._done:
+            self._finished = True
+            return False
+        if isinstance(item, Exception):
+            self._finished = True
+            raise item
+        return True
+
+    def get(self, n=1):
+        """
+        Return a list of up to n items.
+        Blocks until at least one item is available, further items are only
+        returned if they are already buffered.
+        Returns an empty list when the iterator is exhausted.
+        """
+
+        if self._finished:
+            return []
+        items = []
+        item = self._buffer.get()
+        while self._unpack(item):
+            items.append(item)
+            if len(items) >= n:
+                break
+            try:
+                item = self._buffer.get_nowait()
+            except queue.Empty:
+                break
+        return items
+
+    def close(self):
+        """Stop the background thread and discard all buffered items."""
+        self._stop.set()
+        # unblock the producer if it waits for space
+        while self._thread.is_alive():
+            try:
+                self._buffer.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def threaded(chunks, maxsize=4):
+    """
+    Produce chunks in a background thread.
+
+    At most maxsize chunks are buffered, the producer blocks when consumers
+    fall behind. Stopping iteration (e.g. through feed) stops the producer.
+    """
+
+    with Producer(chunks, maxsize) as producer:
+        items = producer.get()
+        while items:
+            yield items[0]
+            items = producer.get()
+
+
+class ChunkWriter:
+    """
+    Consumer that appends chunks to a raw binary file of float64.
+    Use load_chunks to read the file back.
+    """
+
+    def __init__(self, fname):
+        self.fname = Path(fname)
+        self._file = open(self.fname, "wb")
+
+    def __call__(self, chunk):
+        np.ascontiguousarray(chunk, dtype=np.float64).tofile(self._file)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def load_chunks(fname, mmap=True):
+    """Load all states written by ChunkWriter as (N, STATE_SIZE) array, memory-mapped if mmap."""
+    if mmap:
+        if Path(fname).stat().st_size == 0:
+            return np.empty((0, STATE_SIZE))
+        return np.memmap(fname, dtype=np.float64, mode="r").reshape(-1, STATE_SIZE)
+    return np.fromfile(fname, dtype=np.float64).reshape(-1, STATE_SIZE)
@@ -0,0 +1,329 @@
+"""
+Write SVG images without any external tools.
+
+Svg streams elements to a file as they are drawn and merges consecutive line
+segments of the same style into polylines. It has the same line / circle / cmd
+interface as tikz.Tikz. SvgFrames is an animation backend with the interface
+of tk.Tk that writes one SVG file per frame.
+"""
+
+import functools
+from pathlib import Path
+
+import numpy as np
+
+from .graphics import COLOUR_CACHE_SIZE, hex_colour
+from .fileio import init_directory
+from .ping import PingManager
+
+## Size of a TeX point in cm, line widths are given in points when unit="cm".
+PT = 2.54 / 72.27
+
+
+@functools.lru_cache(maxsize=COLOUR_CACHE_SIZE)
+def svg_colour(colour):
+    """Resolve a colour string (see graphics.hex_colour) for use in SVG, None means no colour."""
+    if colour is None:
+        return "none"
+    return hex_colour(colour)
+
+
+class Svg:
+    """
+    An SVG image that is written while it is being drawn.
+
+    Usage:
+        with Svg(transform, "image.svg") as img:
+            img.line(points, draw="red")
+
+    Coordinates are in world space unless screen=True is passed, the image
+    covers the screen space of the transform.
+    """
+
+    def __init__(self, transform, fname=None, background=None, flip=False, unit=None,
+                 precision=3):
+        """
+        Arguments:
+            transform: graphics.Transform that encodes world and screen coordinates.
+            fname: File to stream the image into, if None the image is kept in
+                   memory and can be retrieved with str().
+            background: Colour of the background, None for transparent background.
+            flip: If True, the y-axis of screen space points up like in Tikz,
+                  otherwise down like in Tk.
+            unit: Physical unit of screen space, e.g. "cm". Line widths are then
+                  given in points like in Tikz. If None, screen space is in pixels
+                  and line widths too.
+            precision: Number of decimals of coordinates.
+        """
+
+        self.transform = transform
+        self.fname = fname
+        self.background = background
+        self.flip = flip
+        self.unit = unit
+        self.precision = precision
+
+        self._file = open(fname, "w") if fname is not None else None
+        self._elements = []
+        # (stroke, width) and formatted points of the polyline that can still be extended
+        self._pending_style = None
+        self._pending_points = []
+        self._closed = False
+        self._point_fmt = f"{{:.{precision}f}},{{:.{precision}f}}"
+        # mirror y in screen space
+        self._flip_scale = np.array((1.0, -1.0))
+        self._flip_shift = np.array((0.0, transform.screen_lower[1] + transform.screen_upper[1]))
+
+        self._write(self._header())
+        if background is not None:
+            self.draw_background(background)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __str__(self):
+        """Return the whole document, only possible if the image is kept in memory."""
+        if self._file is not None:
+            raise RuntimeError("Image is written to a file, no copy is kept in memory")
+        self._flush()
+        return "\n".join(self._elements) + ("" if self._closed else "\n</svg>")
+
+    def _header(self):
+        width, height = self.transform.screen_extends()
+        lower = self.transform.screen_lower
+        unit = self.unit or ""
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+                f'width="{width:g}{unit}" height="{height:g}{unit}" '
+                f'viewBox="{lower[0]:g} {lower[1]:g} {width:g} {height:g}">')
+
+    def _write(self, element):
+        if self._file is None:
+            self._elements.append(element)
+        else:
+            self._file.write(element)
+            self._file.write("\n")
+
+    def _flush(self):
+        """Write the pending polyline."""
+        if self._pending_style is None:
+            return
+        stroke, width = self._pending_style
+        points = self._pending_points
+        self._write(f'<path d="M{points[0]}L{" ".join(points[1:])}" fill="none" '
+                    f'stroke="{stroke}" stroke-width="{width:g}" stroke-linejoin="round"/>')
+        self._pending_style = None
+        self._pending_points = []
+
+    def _to_screen(self, points, screen):
+        points = np.asarray(points, dtype=float)
+        if not screen:
+            points = self.transform.world2screen(points)
+        if self.flip:
+            points = points * self._flip_scale + self._flip_shift
+        return points
+
+    def _length(self, length, screen):
+        """Convert a length from world to screen space."""
+        if screen:
+            return length
+        return length * self.transform.screen_extends()[0] / self.transform.world_extends()[0]
+
+    def _line_width(self, lw):
+        return lw * PT if self.unit == "cm" else lw
+
+    def cmd(self, element):
+        """Add an arbitrary SVG element (string)."""
+        self._flush()
+        self._write(element)
+
+    def draw_background(self, colour):
+        """Fill the whole image with a colour."""
+        width, height = self.transform.screen_extends()
+        lower = self.transform.screen_lower
+        self.cmd(f'<rect x="{lower[0]:g}" y="{lower[1]:g}" width="{width:g}" '
+                 f'height="{height:g}" fill="{svg_colour(colour)}"/>')
+
+    def line(self, points, draw="black", lw=1, screen=False):
+        """
+        Draw a line through all given points.
+        Segments touching masked or NaN points are skipped.
+        The line is merged with the previous one if it has the same style and
+        starts where the previous one ended.
+        """
+
+        if np.ma.isMaskedArray(points):
+            points = points.astype(float).filled(np.nan)
+        coords = self._to_screen(np.asarray(points, dtype=float)[:, :2], screen)
+        style = (svg_colour(draw), self._line_width(lw if lw is not None else 1))
+
+        valid = ~np.isnan(coords).any(axis=1)
+        if valid.all():
+            runs = ((0, len(coords)),)
+        else:
+            # split into runs of valid points
+            edges = np.flatnonzero(np.diff(np.concatenate(([False], valid, [False]))))
+            runs = zip(edges[::2], edges[1::2])
+
+        for start, end in runs:
+            if end - start < 2:
+                continue
+            formatted = [self._point_fmt.format(x, y) for x, y in coords[start:end].tolist()]
+            if style == self._pending_style and formatted[0] == self._pending_points[-1]:
+                self._pending_points.extend(formatted[1:])
+            else:
+                self._flush()
+                self._pending_style = style
+                self._pending_points = formatted
+
+    def circle(self, pos, radius, fill="black", draw=None, lw=0, screen=False):
+        """Draw a circle at given position, draw=None uses the fill colour for the outline."""
+        if draw is None:
+            draw = fill
+        centre = self._to_screen(pos, screen)
+        self.cmd(f'<circle cx="{centre[0]:.{self.precision}f}" '
+                 f'cy="{centre[1]:.{self.precision}f}" '
+                 f'r="{self._length(radius, screen):.{self.precision}f}" '
+                 f'fill="{svg_colour(fill)}" stroke="{svg_colour(draw)}" '
+                 f'stroke-width="{self._line_width(lw):g}"/>')
+
+    def close(self):
+        """Finish the image and close the file."""
+        if self._closed:
+            return
+        self._flush()
+        self._write("</svg>")
+        self._closed = True
+        if self._file is not None:
+            self._file.close()
+
+
+class SvgFrames:
+    """
+    Animation backend with the interface of tk.Tk that writes every frame as SVG.
+
+    Objects are kept in a display list in screen space, update() writes the
+    current state to the next numbered file in a directory.
+    """
+
+    def __init__(self, transform, path, background=None, overwrite=True, precision=2):
+        self.transform = transform
+        self.background = background
+        self.precision = precision
+        self.path = Path(path)
+        init_directory(self.path, overwrite)
+
+        # gid -> [tags, kind, properties], in drawing order
+        self._items = {}
+        self._next_gid = 1
+        self._nframes = 0
+        self._pings = PingManager()
+
+    def _add(self, tags, kind, **properties):
+        gid = self._next_gid
+        self._next_gid += 1
+        if tags is None:
+            tags = ()
+        elif isinstance(tags, str):
+            tags = (tags,)
+        self._items[gid] = [tuple(tags), kind, properties]
+        return gid
+
+    def _matches(self, gid, objects):
+        if objects == "all":
+            return True
+        if isinstance(objects, str):
+            return objects in self._items[gid][0]
+        return gid == objects
+
+    def clear(self, objects="all"):
+        """Delete objects given by ID or tag."""
+        if objects is None:
+            return
+        self._items = {gid: item for gid, item in self._items.items()
+                       if not self._matches(gid, objects)}
+
+    def update(self):
+        """Write the current frame."""
+        self._pings.update(self)
+        with Svg(self.transform, self.path/f"{self._nframes:04d}.svg",
+                 precision=self.precision) as img:
+            for _, kind, properties in self._items.values():
+                if kind == "line":
+                    img.line(properties["points"], properties["draw"], properties["lw"],
+                             screen=True)
+                elif kind == "circle":
+                    # outline of 1 pixel like in Tk
+                    img.circle(properties["pos"], properties["radius"], properties["fill"],
+                               properties["draw"], lw=1, screen=True)
+                elif self.background is not None:
+                    img.draw_background(self.background)
+        self._nframes += 1
+
+    def lower(self, tag, below):
+        """Move all objects with given tag below the objects tagged with below."""
+        moved = {gid: item for gid, item in self._items.items() if tag in item[0]}
+        items = {}
+        for gid, item in self._items.items():
+            if below in item[0] and moved:
+                items.update(moved)
+                moved = {}
+            if tag not in item[0]:
+                items[gid] = item
+        items.update(moved)
+        self._items = items
+
+    def draw_background(self):
+        """Draw fullscreen rectangle with background colour."""
+        return self._add("background", "background")
+
+    def circle(self, pos, radius, fill, draw=None, tags=None):
+        """Draw a circle at given position with given radius."""
+        return self._add(tags, "circle", pos=self.transform.world2screen(np.asarray(pos)),
+                         radius=radius * self.transform.screen_extends()[0]
+                         / self.transform.world_extends()[0],
+                         fill=fill, draw=fill if draw is None else draw)
+
+    def update_circles(self, gids, positions, radii):
+        """Move and resize existing circles, positions and radii are arrays."""
+        positions = self.transform.world2screen(np.asarray(positions))
+        radii = np.asarray(radii) * self.transform.screen_extends()[0] \
+            / self.transform.world_extends()[0]
+        for gid, pos, radius in zip(gids, positions, radii):
+            if gid in self._items:
+                self._items[gid][2].update(pos=pos, radius=radius)
+
+    def recolour(self, gid, fill, draw=None, pos=None, radius=None):
+        """
+        Change the colours of an existing circle.
+        If pos and radius are given, also move and resize it.
+        """
+        if gid not in self._items:
+            return
+        self._items[gid][2].update(fill=fill, draw=fill if draw is None else draw)
+        if radius is not None:
+            self._items[gid][2].update(
+                pos=self.transform.world2screen(np.asarray(pos)),
+                radius=radius * self.transform.screen_extends()[0]
+                / self.transform.world_extends()[0])
+
+    def line(self, points, draw, lw=1, tags=None, screen=False):
+        """
+        Draw a line through all given points.
+        Returns a list with the ID of the line, like tk.Tk.line.
+        """
+        points = np.ma.asarray(points, dtype=float)
+        if not screen:
+            points = self.transform.world2screen(points)
+        return [self._add(tags, "line", points=points.copy(), draw=draw, lw=lw)]
+
+    def ping(self, pos, colour, radius_final=None, radius_initial=None, nframes=10):
+        """Place an animated ping at some location."""
+        if radius_final is None:
+            radius_final = self.transform.world_width()/100
+        if radius_initial is None:
+            radius_initial = self.transform.world_width()/5
+        self._pings.add(pos, colour, radius_final, radius_initial, nframes)
@@ -0,0 +1,130 @@
+"""
+Run parameter sweeps over the GR coefficients in parallel.
+
+Results are streamed to a JSON Lines file, one completed point per line.
+Sweeps can be resumed, points that are already in the file are skipped.
+"""
+
+import itertools
+import json
+import multiprocessing
+from pathlib import Path
+import time
+
+import numpy as np
+
+from .physics import CBody, advance
+from .tracker import ExtremaTracker
+
+
+def default_length(body):
+    """Trajectory length per call to advance used by the scripts."""
+    return 2.0 * np.linalg.norm(body.v) / body.acc / 2
+
+def sweep_points(alphas, betas, nsteps, lengths=(None,)):
+    """
+    Return list of all combinations of parameters as dicts.
+    A length of None is replaced by default_length of Mercury.
+    """
+
+    default = default_length(CBody.mercury())
+    return [{"alpha": float(alpha), "beta": float(beta), "nsteps": int(nstep),
+             "length": float(default if length is None else length)}
+            for alpha, beta, nstep, length in itertools.product(alphas, betas, nsteps, lengths)]
+
+def point_key(point):
+    """Return a hashable key identifying a point of a sweep."""
+    return (point["alpha"], point["beta"], point["nsteps"], point["length"])
+
+def precession(perihelia):
+    """
+    Return the average change in angle between subsequent perihelia in radians.
+    Returns NaN if there are fewer than two perihelia.
+    """
+
+    if len(perihelia) < 2:
+        return float("nan")
+    perihelia = np.asarray(perihelia)
+    angles = np.unwrap(np.arctan2(perihelia[:, 1], perihelia[:, 0]))
+    return float(np.polyfit(np.arange(len(angles)), angles, 1)[0])
+
+def run_point(point, ncalls):
+    """Integrate the orbit of Mercury for one point of a sweep and return the results."""
+
+    start = time.perf_counter()
+
+    mercury = CBody.mercury()
+    perihelia = []
+    tracker = ExtremaTracker(CBody.sun(), on_periapsis=perihelia.append)
+    for _ in range(ncalls):
+        mercury = advance(mercury, tracker=tracker, **point)
+
+    return {**point,
+            "ncalls": ncalls,
+            "nperihelia": len(perihelia),
+            "precession": precession(perihelia),
+            "x": mercury.x.tolist(),
+            "v": mercury.v.tolist(),
+            "seconds": time.perf_counter() - start}
+
+def _run_point_star(args):
+    return run_point(*args)
+
+def load_results(fname):
+    """Load all results from a sweep file, ignores a truncated last line."""
+
+    fname = Path(fname)
+    if not fname.exists():
+        return []
+
+    results = []
+    with open(fname, "r") as inf:
+        for line in inf:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                # last line may be incomplete if the sweep was interrupted
+                break
+    return results
+
+def run_sweep(points, fname, ncalls, processes=None, chunksize=1, progress=None):
+    """
+    Run all points of a sweep using a pool of processes.
+
+    Arguments:
+        points: List of parameter dicts, e.g. from sweep_points.
+        fname: JSON Lines file that results are appended to.
+        ncalls: Number of calls to advance per point.
+        processes: Number of worker processes, None for the number of cores.
+        chunksize: Number of points to send to a worker at once.
+        progress: Function to call with (ndone, ntotal) after each completed point.
+    Returns:
+        Number of points that were computed (excluding those skipped).
+    """
+
+    fname = Path(fname)
+    done = {point_key(result) for result in load_results(fname) if result["ncalls"] == ncalls}
+    todo = [point for point in points if point_key(point) not in done]
+
+    if fname.exists():
+        # drop a potentially truncated last line
+        _truncate_incomplete(fname)
+
+    with open(fname, "a") as outf, multiprocessing.Pool(processes) as pool:
+        for ndone, result in enumerate(pool.imap_unordered(_run_point_star,
+                                                           ((point, ncalls) for point in todo),
+                                                           chunksize=chunksize)):
+            outf.write(json.dumps(result, separators=(",", ":"))+"\n")
+            outf.flush()
+            if progress:
+                progress(ndone+1, len(todo))
+
+    return len(todo)
+
+def _truncate_incomplete(fname):
+    """Remove everything after the last newline in a file."""
+    with open(fname, "rb+") as f:
+        content = f.read()
+        end = content.rfind(b"\n") + 1
+        if end != len(content):
+            f.truncate(end)
@@ -6,14 +6,37 @@ import subprocess
 from tempfile import TemporaryDirectory
 from pathlib import Path
 import shutil
+import functools
 
-from .graphics import COLOURS, norm_colour
+from .graphics import COLOURS, COLOUR_CACHE_SIZE, norm_colour, rgb_colour
+from .fileio import convert_sizes
 
 def define_colours(colours):
     """Return list of colour definition commands for all given colours (based on graphics.COLOURS)."""
     return [rf"\definecolor{{{colour}}}{{HTML}}{{{COLOURS[colour].hex[1:]}}}"
             for colour in colours]
 
+@functools.lru_cache(maxsize=COLOUR_CACHE_SIZE)
+def tikz_colour(colour):
+    """
+    Resolve a colour string for use in Tikz.
+    Names and mixes of names are passed on to xcolor, colours involving hex values
+    are converted to an explicit RGB colour.
+    """
+    colour = norm_colour(colour)
+    if colour is None or "#" not in colour:
+        return colour
+    try:
+        rgb = rgb_colour(colour)
+    except ValueError:
+        return colour
+    return "{{rgb,255:red,{};green,{};blue,{}}}".format(*(round(c*255) for c in rgb))
+
+@functools.lru_cache(maxsize=COLOUR_CACHE_SIZE)
+def _custom_colours(colour):
+    """Return all colours from graphics.COLOURS that appear in a colour string."""
+    return frozenset(col for col in colour.split("!") if col in COLOURS)
+
 def fmt_point(point):
     """Format a 2D point."""
     assert len(point) == 2
@@ -132,18 +155,8 @@ class Tikz:
         if colour is None:
             return
 
-        def _not_convertible_to_float(item):
-            try:
-                float(item)
-            except ValueError:
-                return True
-            return False
-
-        # look at all components and ignore numbers
-        for col in filter(_not_convertible_to_float, colour.split("!")):
-            if col in COLOURS.keys() and not col in self.global_colours:
-                self._used_colours.add(col)
-            # else: assume it is known in LaTeX (hex value)
+        self._used_colours.update(_custom_colours(colour) - self.global_colours)
+        # other colours are assumed to be known in LaTeX
 
     def cmd(self, command):
         """Add an arbitrary command."""
@@ -162,7 +175,7 @@ class Tikz:
             kwoptions: dict of extra keyword options to pass to \draw.
         """
 
-        draw = norm_colour(draw)
+        draw = tikz_colour(draw)
         self.use_colour(draw)
 
         if kwoptions is None:
@@ -192,9 +205,9 @@ class Tikz:
             kwoptions: dict of extra keyword options to pass to \draw.
         """
 
-        draw = norm_colour(draw)
+        draw = tikz_colour(draw)
         self.use_colour(draw)
-        fill = norm_colour(fill)
+        fill = tikz_colour(fill)
         self.use_colour(fill)
 
         self._commands.append(rf"\node[{shape+',' if shape else ''}"
@@ -207,10 +220,10 @@ class Tikz:
         Draw a circle at given position.
         """
 
-        fill = norm_colour(fill)
+        fill = tikz_colour(fill)
         self.use_colour(fill)
 
-        draw = norm_colour(draw)
+        draw = tikz_colour(draw)
         if draw is None:
             draw = fill
         self.use_colour(draw)
@@ -245,7 +258,8 @@ def write(image, fname, extra_preamble=None):
 \end{{document}}
 """)
 
-def render(image, out_fname="img.pdf", source_fname=None, extra_preamble=None):
+def render(image, out_fname="img.pdf", source_fname=None, extra_preamble=None, rasters=None,
+           processes=1):
     """
     Render a Tikz image to PDF by using pdflatex.
     Write and compile TeX in a temporary directory and store only the output file
@@ -255,6 +269,9 @@ def render(image, out_fname="img.pdf", source_fname=None, extra_preamble=None):
         image: Tikz object containing the drawing commands.
         out_fname: Name/path of the output file.
         source_fname: If not None, save the source under this name/path.
+        rasters: dict mapping PNG file names to sizes (width, height), the PDF is
+                 rasterized once for all sizes, see fileio.convert_sizes.
+        processes: Number of threads for producing the PNGs.
     """
     with TemporaryDirectory() as workdir:
         workdir = Path(workdir)
@@ -270,3 +287,5 @@ def render(image, out_fname="img.pdf", source_fname=None, extra_preamble=None):
         if source_fname:
             shutil.copy(workdir/"img.tex", source_fname)
         shutil.copy(workdir/"img.pdf", out_fname)
+        if rasters:
+            convert_sizes(workdir/"img.pdf", rasters, processes)
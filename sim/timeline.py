@@ -0,0 +1,104 @@
+"""
+Decouple simulation steps from display frames.
+
+A Timeline integrates a body with whatever step size is needed for accuracy
+and buffers the states. States at arbitrary times in between are computed by
+cubic Hermite interpolation of position and velocity, so frames can be
+produced at any rate without changing the physics.
+"""
+
+import collections
+
+import numpy as np
+
+from .physics import CBody
+from .streaming import stream
+
+
+def hermite(x0, v0, x1, v1, h, u):
+    """
+    Cubic Hermite interpolation between states (x0, v0) and (x1, v1) that are h apart in time.
+    u is the fraction of h in [0, 1], all arguments can be arrays that broadcast.
+    Returns interpolated position and velocity.
+    """
+
+    u2 = u*u
+    u3 = u2*u
+    x = (2*u3 - 3*u2 + 1)*x0 + (u3 - 2*u2 + u)*h*v0 + (-2*u3 + 3*u2)*x1 + (u3 - u2)*h*v1
+    v = ((6*u2 - 6*u)*x0 + (-6*u2 + 6*u)*x1) / h + (3*u2 - 4*u + 1)*v0 + (3*u2 - 2*u)*v1
+    return x, v
+
+
+class Timeline:
+    """
+    Buffered states of a body at times k*params["length"], k = 0, 1, ...
+
+    Query states with Timeline.state(t) for monotonically increasing times.
+    States that are no longer needed are discarded, so memory is bounded by chunk.
+    """
+
+    def __init__(self, body, params, chunk=64, tracker=None, events=None):
+        """
+        Arguments:
+            body: Initial CBody at time 0, is not modified.
+            params: Integrator parameters as for physics.advance.
+                    params["length"] is the time between buffered states.
+            chunk: Number of states to integrate at once.
+            tracker: Fed with the body after every integration step.
+            events: events.Events to detect during integration, must not be terminal.
+        """
+
+        self.acc = body.acc
+        self.step = params["length"]
+        self._states = stream(body, params, chunk=chunk, tracker=tracker,
+                              events=events)
+        # buffered chunks, first row of first chunk is at time self._start*self.step
+        self._chunks = collections.deque([np.concatenate((body.x, body.v))[np.newaxis, :]
+                                          .astype(float)])
+        self._start = 0
+        self._end = 1  # index after the last buffered state
+
+    def _row(self, index):
+        """Return the buffered state with given index."""
+        while index >= self._end:
+            chunk = next(self._states)
+            self._chunks.append(chunk)
+            self._end += len(chunk)
+        if index < self._start:
+            raise ValueError("Times passed to Timeline must not decrease")
+
+        offset = index - self._start
+        for chunk in self._chunks:
+            if offset < len(chunk):
+                return chunk[offset]
+            offset -= len(chunk)
+        raise IndexError(index)  # unreachable
+
+    def state(self, t):
+        """Return position and velocity at time t."""
+        index = int(t // self.step)
+        u = t / self.step - index
+        s0 = self._row(index)
+        s1 = self._row(index+1)
+        # drop chunks that lie entirely before index
+        while index >= self._start + len(self._chunks[0]):
+            self._start += len(self._chunks.popleft())
+        return hermite(s0[:2], s0[2:], s1[:2], s1[2:], self.step, u)
+
+    def body(self, t):
+        """Return a CBody with the state at time t."""
+        x, v = self.state(t)
+        return CBody(x, v, self.acc)
+
+    def frames(self, fps, speed, duration=None):
+        """
+        Generator of (t, x, v) for frames played at fps where speed is the
+        simulated time per second of playback. Runs forever if duration
+        (in seconds of playback) is None.
+        """
+
+        frame = 0
+        while duration is None or frame < duration * fps:
+            frame += 1
+            t = frame * speed / fps
+            yield (t, *self.state(t))
@@ -3,8 +3,7 @@ import tkinter
 import numpy as np
 
 from .graphics import hex_colour
-from .util import neighbours
-from .ping import Ping
+from .ping import PingManager
 
 def setup_window(width, height, background):
     """Open a new window contianing a canvas."""
@@ -28,7 +27,7 @@ class Tk:
 
         self.window, self.canvas = setup_window(*self.transform.screen_extends(), background)
 
-        self._entities = []
+        self._pings = PingManager()
 
     def clear(self, objects="all"):
         """Delete given objects from canvas."""
@@ -36,10 +35,13 @@ class Tk:
 
     def update(self):
         """Update the display."""
-        for entity in self._entities:
-            entity.draw(self)
+        self._pings.update(self)
         self.window.update()
 
+    def lower(self, tag, below):
+        """Move all objects with given tag below the objects tagged with below."""
+        self.canvas.tag_lower(tag, below)
+
     def draw_background(self):
         """Draw fullscreen rectangle with background colour."""
         return self.canvas.create_rectangle(*self.transform.screen_lower,
@@ -58,12 +60,43 @@ class Tk:
                                        outline=hex_colour(draw),
                                        tags=tags)
 
-    def line(self, points, draw, lw=1, tags=None):
-        """Draw a line through all given points."""
-        return [self.canvas.create_line(*p0[:2], *p1[:2], fill=hex_colour(draw),
+    def update_circles(self, gids, positions, radii):
+        """Move and resize existing circles, positions and radii are arrays."""
+        radii = np.asarray(radii)[:, np.newaxis]
+        lower = self.transform.world2screen(positions - radii).tolist()
+        upper = self.transform.world2screen(positions + radii).tolist()
+        for gid, low, up in zip(gids, lower, upper):
+            self.canvas.coords(gid, *low, *up)
+
+    def recolour(self, gid, fill, draw=None, pos=None, radius=None):
+        """
+        Change the colours of an existing circle.
+        If pos and radius are given, also move and resize it.
+        """
+        if draw is None:
+            draw = fill
+        if radius is not None:
+            self.canvas.coords(gid, *self.transform.world2screen(pos-radius),
+                               *self.transform.world2screen(pos+radius))
+        self.canvas.itemconfigure(gid, fill=hex_colour(fill), outline=hex_colour(draw))
+
+    def line(self, points, draw, lw=1, tags=None, screen=False):
+        """
+        Draw a line through all given points.
+        Segments touching masked or NaN points are skipped.
+        Points are in world space unless screen is True.
+        """
+
+        points = np.ma.asarray(points, dtype=float)
+        if not screen:
+            points = self.transform.world2screen(points)
+        valid = ~(np.ma.getmaskarray(points).any(axis=1)
+                  | np.isnan(np.ma.getdata(points)).any(axis=1))
+        coords = np.ma.getdata(points)[:, :2].tolist()
+        colour = hex_colour(draw)
+        return [self.canvas.create_line(*coords[i], *coords[i+1], fill=colour,
                                         width=lw, tags=tags)
-                for p0, p1 in neighbours(map(self.transform.world2screen, points))
-                if not np.ma.is_masked(p0) and not np.ma.is_masked(p1)]
+                for i in np.flatnonzero(valid[:-1] & valid[1:])]
 
     def ping(self, pos, colour, radius_final=None, radius_initial=None, nframes=10):
         """Place an animated ping at some location."""
@@ -71,4 +104,4 @@ class Tk:
             radius_final = self.transform.world_width()/100
         if radius_initial is None:
             radius_initial = self.transform.world_width()/5
-        self._entities.append(Ping(pos, colour, radius_final, radius_initial, nframes))
+        self._pings.add(pos, colour, radius_final, radius_initial, nframes)
@@ -31,7 +31,7 @@ class ExtremaTracker:
         self._before = None
 
     def _process_radius(self, old, current, point):
-        """Process a new radius."""
+        """Process a new radius, point is copied before being passed to callbacks."""
 
         if self._increasing is None:
             # first measured radius
@@ -40,13 +40,13 @@ class ExtremaTracker:
         elif self._increasing and old > current:
             # passed apapsis
             if self.on_apapsis:
-                self.on_apapsis(point)
+                self.on_apapsis(np.array(point))
             self._increasing = False
 
         elif not self._increasing and old < current:
             # passed periapsis
             if self.on_periapsis:
-                self.on_periapsis(point)
+                self.on_periapsis(np.array(point))
             self._increasing = True
 
     def add_point(self, point):
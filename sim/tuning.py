@@ -0,0 +1,157 @@
+"""
+Choose integrator parameters for a requested accuracy.
+
+The accuracy of physics.advance depends on the step size length/nsteps.
+tune() integrates a few orbits with successively doubled numbers of steps,
+measures the perihelion precession with a periapsis event, and estimates the
+error of every step size by Richardson extrapolation. It returns the cheapest
+number of steps whose estimated precession error is within a tolerance.
+
+Usage:
+    params, report = tune(1e-4, beta=2e6)
+    mercury = physics.advance(mercury, **params)
+"""
+
+import math
+import time
+
+import numpy as np
+
+from .physics import CBody, energy, angular_momentum
+from .streaming import stream
+from .sweep import default_length, precession
+from .events import Events, periapsis
+
+## Bounds of the estimated order of convergence of the precession.
+MIN_ORDER = 0.5
+MAX_ORDER = 4.0
+
+
+def orbital_period(body, alpha=0.0, beta=0.0):
+    """Return the period of the Kepler orbit with the same energy as body."""
+    specific_energy = float(energy(body.x, body.v, body.acc, alpha, beta))
+    if specific_energy >= 0:
+        raise ValueError("Body is not on a bound orbit")
+    semi_major_axis = -body.acc / (2*specific_energy)
+    return 2*math.pi * math.sqrt(semi_major_axis**3 / body.acc)
+
+def calibrate(body, length, nsteps, alpha, beta, norbits=3):
+    """
+    Integrate body for norbits orbits around the origin and measure the accuracy.
+
+    Returns a dict with
+     - precession: Average perihelion advance per orbit in radians.
+     - energy_drift, momentum_drift: Maximum relative deviation of energy and
+       angular momentum from their initial values, sampled every length.
+     - steps: Number of integration steps.
+     - seconds: Wall time of the integration.
+    """
+
+    if norbits < 2:
+        raise ValueError("At least two orbits are needed to measure the precession")
+
+    params = {"length": length, "nsteps": nsteps, "alpha": alpha, "beta": beta}
+    perihelion = periapsis(terminal=norbits)
+    events = Events([perihelion])
+    # stop if the perihelia are not found, e.g. if the step size is far too large
+    ncalls = math.ceil(2 * (norbits+1) * orbital_period(body, alpha, beta) / length)
+
+    start = time.perf_counter()
+    states = np.concatenate(list(stream(body, params, chunk=1024, ncalls=ncalls,
+                                        events=events)))
+    seconds = time.perf_counter() - start
+
+    energies = energy(states[:, :2], states[:, 2:], body.acc, alpha, beta)
+    momenta = angular_momentum(states[:, :2], states[:, 2:])
+    initial_energy = energy(body.x, body.v, body.acc, alpha, beta)
+    initial_momentum = angular_momentum(body.x, body.v)
+
+    return {"nsteps": nsteps,
+            "length": length,
+            "precession": precession(events.occurrences(perihelion)[:, 1:3]),
+            "energy_drift": float(np.abs(energies/initial_energy - 1).max()),
+            "momentum_drift": float(np.abs(momenta/initial_momentum - 1).max()),
+            "steps": round(events.time * nsteps / length),
+            "seconds": seconds}
+
+def _order(levels):
+    """Estimate the order of convergence from the last three of levels with doubled nsteps."""
+    if len(levels) < 3:
+        return 1.0
+    coarse = abs(levels[-3]["precession"] - levels[-2]["precession"])
+    fine = abs(levels[-2]["precession"] - levels[-1]["precession"])
+    if coarse == 0 or fine == 0:
+        return 1.0
+    return min(max(math.log2(coarse / fine), MIN_ORDER), MAX_ORDER)
+
+def tune(tolerance, body=None, length=None, alpha=0.0, beta=0.0, norbits=3,
+         min_nsteps=1, max_nsteps=4096):
+    """
+    Find the smallest nsteps per length whose precession error is below tolerance.
+
+    Arguments:
+        tolerance: Maximum error of the perihelion precession per orbit in radians.
+        body: Initial CBody, defaults to Mercury.
+        length: Trajectory length per call to advance, defaults to sweep.default_length.
+        alpha, beta: GR coefficients as for physics.advance.
+        norbits: Number of orbits of every calibration run.
+        min_nsteps, max_nsteps: Range of numbers of steps to consider.
+    Returns:
+        (params, report) where params are the integrator parameters for
+        physics.advance and report is a dict with the result of calibrate for the
+        chosen nsteps plus
+         - error: Estimated precession error per orbit.
+         - order: Estimated order of convergence.
+         - steps_per_orbit: Integration steps per orbit, i.e. the cost.
+         - seconds_per_orbit: Expected wall time per orbit.
+         - levels: Results of all calibration runs.
+    Raises:
+        RuntimeError if max_nsteps does not reach the tolerance.
+    """
+
+    if body is None:
+        body = CBody.mercury()
+    if length is None:
+        length = float(default_length(body))
+
+    levels = []
+    nsteps = min_nsteps
+    while nsteps <= max_nsteps:
+        levels.append(calibrate(body, length, nsteps, alpha, beta, norbits))
+        if len(levels) >= 2:
+            order = _order(levels)
+            # error of the previous level relative to the extrapolated precession
+            error = abs(levels[-2]["precession"] - levels[-1]["precession"]) \
+                / (1 - 2**-order)
+            if error <= tolerance:
+                return _choose(levels, error, order, tolerance, body, alpha, beta, norbits)
+        nsteps *= 2
+
+    raise RuntimeError(f"Precession error is above {tolerance} with up to {max_nsteps} steps")
+
+def _choose(levels, error, order, tolerance, body, alpha, beta, norbits):
+    """
+    Return the result of tune given that levels[-2] meets the tolerance.
+    Interpolates between levels[-3] and levels[-2] with the error model
+    error ~ (length/nsteps)**order to find the cheapest nsteps.
+    """
+
+    passing = levels[-2]
+    length = passing["length"]
+    lower = levels[-3]["nsteps"] if len(levels) >= 3 else 0
+    nsteps = max(math.ceil(passing["nsteps"] * (error / tolerance)**(1/order)), lower + 1)
+
+    if nsteps < passing["nsteps"]:
+        result = calibrate(body, length, nsteps, alpha, beta, norbits)
+        error = error * (passing["nsteps"] / nsteps)**order
+    else:
+        result = passing
+
+    steps_per_orbit = orbital_period(body, alpha, beta) * nsteps / length
+    params = {"length": length, "nsteps": nsteps, "alpha": alpha, "beta": beta}
+    return params, {**result,
+                    "error": error,
+                    "order": order,
+                    "steps_per_orbit": steps_per_orbit,
+                    "seconds_per_orbit": result["seconds"] / result["steps"] * steps_per_orbit,
+                    "levels": levels}
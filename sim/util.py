@@ -36,3 +36,11 @@ def interpolate(start, stop, nstep):
         yield current
         current += step
     return stop
+
+def parse_sizes(string):
+    """Parse image sizes 'WIDTHxHEIGHT,...' into a list of (width, height) tuples."""
+    sizes = []
+    for size in string.split(","):
+        width, height = size.lower().split("x")
+        sizes.append((int(width), int(height)))
+    return sizes